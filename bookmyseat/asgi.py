@@ -2,6 +2,9 @@
 ASGI config for bookmyseat project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it (e.g. ``uvicorn bookmyseat.asgi:application``) to use the live seat
+event stream, which is an async streaming view, and to serve the async
+catalog and seat map views (see ASYNC_VIEWS_GUIDE.md).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -103,6 +104,42 @@ DATABASES = {
     }
 }
 
+# Cache Configuration
+# The catalog and seat map versions live here, so every worker process must
+# share it: by default a file cache in the temp directory, seen by all workers
+# on the host. Across several hosts use Redis (CACHE_BACKEND=
+# django.core.cache.backends.redis.RedisCache, CACHE_LOCATION=redis://...).
+# LocMemCache is per process and only safe with a single worker.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'bookmyseat_cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Seconds a seat map snapshot is kept; writers bump a version instead of deleting
+# (at most 5 seconds with a per-process LocMemCache)
+SEAT_MAP_CACHE_TIMEOUT = 300
+
+# Live seat events (ASGI only): pub/sub backend and seconds between keepalives.
+# InProcessBroker reaches subscribers in the same process only.
+SEAT_EVENTS_BROKER = os.environ.get('SEAT_EVENTS_BROKER', 'movies.pubsub.InProcessBroker')
+SEAT_EVENTS_KEEPALIVE = 15
+# Off by default: the stream is an endless async response that pins a worker
+# under WSGI (gunicorn). Enable only when serving bookmyseat.asgi.
+SEAT_EVENTS_ENABLED = os.environ.get('SEAT_EVENTS_ENABLED', 'False') == 'True'
+
+# Cache-Control max-age for anonymous catalog pages and for the static demo deployment
+HTTP_CACHE_MAX_AGE = 60
+DEMO_HTTP_CACHE_MAX_AGE = 3600
+
+# Sessions only carry the login and the pending booking ids, so by default they
+# live in a signed cookie and cost no database reads or writes. With a shared
+# CACHE_BACKEND (Redis/Memcached) use django.contrib.sessions.backends.cache to
+# keep sessions revocable on the server. See SESSIONS_GUIDE.md.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.signed_cookies')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
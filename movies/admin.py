@@ -1,7 +1,10 @@
 from django.contrib import admin
-from .models import Movie, Theater, Seat,Booking
+from django.db import transaction
+from django.db.models import F
+from .models import Movie, Theater, Seat,Booking, DailySalesRollup, SeatLayout
 from django.urls import reverse
 from django.utils.html import format_html
+from .sales_rollup import remove_sales
 
 # Customize admin site
 admin.site.site_header = "BookMySeat Administration"
@@ -31,16 +34,45 @@ class MovieAdmin(admin.ModelAdmin):
     has_trailer.boolean = True
     has_trailer.short_description = 'Trailer'
 
+@admin.register(SeatLayout)
+class SeatLayoutAdmin(admin.ModelAdmin):
+    list_display = ['name', 'seat_count', 'created_at']
+    search_fields = ['name']
+
 @admin.register(Theater)
 class TheaterAdmin(admin.ModelAdmin):
-    list_display = ['name', 'movie', 'time']
+    list_display = ['name', 'movie', 'time', 'layout']
+    list_filter = ['layout']
+    actions = ['generate_seats']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # A new show with a layout gets all of its seats at once
+        if obj.layout_id and not obj.seats.exists():
+            obj.layout.generate_seats(obj)
+    
+    @admin.action(description='Generate seats from layout (shows without seats)')
+    def generate_seats(self, request, queryset):
+        created = 0
+        for theater in queryset.filter(layout__isnull=False, seats__isnull=True).select_related('layout'):
+            created += len(theater.layout.generate_seats(theater))
+        self.message_user(request, f'Created {created} seats')
 
 @admin.register(Seat)
 class SeatAdmin(admin.ModelAdmin):
     list_display = ['theater', 'seat_number', 'is_booked', 'is_reserved', 'reserved_by', 'reserved_until']
     list_filter = ['is_booked', 'theater']
     search_fields = ['seat_number', 'theater__name']
-    readonly_fields = ['reserved_by', 'reserved_until']
+    readonly_fields = ['reserved_by', 'reserved_until', 'version']
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Write only the edited columns so a hold placed meanwhile is not overwritten
+        if form.changed_data:
+            obj.version = F('version') + 1
+            obj.save(update_fields=[*form.changed_data, 'version'])
+            obj.refresh_from_db(fields=['version'])
     
     def is_reserved(self, obj):
         from django.utils import timezone
@@ -65,3 +97,29 @@ class BookingAdmin(admin.ModelAdmin):
             'fields': ('payment_status', 'payment_method', 'payment_id', 'amount', 'currency', 'payment_date')
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        """Refunding (or otherwise un-paying) a booking takes it out of the sales rollup"""
+        previous = Booking.objects.filter(pk=obj.pk, payment_status='paid').first() if change else None
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if previous is not None and obj.payment_status != 'paid':
+                remove_sales([previous])
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            if obj.payment_status == 'paid':
+                remove_sales([obj])
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            paid = list(queryset.filter(payment_status='paid'))
+            super().delete_queryset(request, queryset)
+            remove_sales(paid)
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['day', 'movie', 'theater', 'payment_method', 'bookings', 'seats', 'revenue']
+    list_filter = ['day', 'payment_method']
+    readonly_fields = ['day', 'movie', 'theater', 'payment_method', 'bookings', 'seats', 'revenue']
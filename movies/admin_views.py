@@ -1,10 +1,12 @@
 from django.shortcuts import render
+from django.http import JsonResponse
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count, Sum, Q, F, Avg
+from django.db.models import Count, Sum, Q, F
 from django.utils import timezone
 from datetime import timedelta
-from .models import Booking, Movie, Theater, Seat
+from .models import Booking, Movie, Theater, Seat, DailySalesRollup
 from django.contrib.auth.models import User
+from .catalog import catalog_stats
 import json
 
 
@@ -14,120 +16,151 @@ def admin_dashboard(request):
     
     # Get date range filter (default: last 30 days)
     days = int(request.GET.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
+    now = timezone.now()
+    start_date = now - timedelta(days=days)
+    
+    # Paid sales come from the daily rollup (one row per day x movie x
+    # theater x payment method), so their cost does not grow with bookings.
+    # The selected period is therefore counted in whole days.
+    # Refunds and deletions made in the Booking admin are subtracted; other
+    # manual edits need `manage.py rebuild_sales_rollup`.
+    start_day = timezone.localdate(start_date)
+    sales = DailySalesRollup.objects.all()
+    
+    # ========== BOOKING & REVENUE TOTALS ==========
+    totals = sales.aggregate(
+        paid_revenue=Sum('revenue'),
+        paid_count=Sum('seats'),
+        period_revenue=Sum('revenue', filter=Q(day__gte=start_day)),
+        period_count=Sum('seats', filter=Q(day__gte=start_day)),
+    )
+    totals['paid_count'] = totals['paid_count'] or 0
+    
+    # Unpaid statuses are small, indexed subsets of Booking
+    open_statuses = [status for status, _ in Booking.PAYMENT_STATUS_CHOICES if status != 'paid']
+    status_aggregates = {}
+    for status in open_statuses:
+        status_aggregates[f'{status}_count'] = Count('id', filter=Q(payment_status=status))
+        status_aggregates[f'{status}_revenue'] = Sum('amount', filter=Q(payment_status=status))
+    totals.update(Booking.objects.filter(payment_status__in=open_statuses).aggregate(**status_aggregates))
     
-    # ========== REVENUE METRICS ==========
     # Total revenue (paid bookings only)
-    total_revenue = Booking.objects.filter(
-        payment_status='paid'
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    total_revenue = totals['paid_revenue'] or 0
     
     # Revenue in selected period
-    period_revenue = Booking.objects.filter(
-        payment_status='paid',
-        payment_date__gte=start_date
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Revenue by payment method
-    revenue_by_method = Booking.objects.filter(
-        payment_status='paid'
-    ).values('payment_method').annotate(
-        total=Sum('amount'),
-        count=Count('id')
-    ).order_by('-total')
+    period_revenue = totals['period_revenue'] or 0
     
     # Average ticket price
-    avg_ticket_price = Booking.objects.filter(
-        payment_status='paid'
-    ).aggregate(avg=Avg('amount'))['avg'] or 0
-    
+    avg_ticket_price = total_revenue / totals['paid_count'] if totals['paid_count'] else 0
     
-    # ========== BOOKING METRICS ==========
     # Total bookings
-    total_bookings = Booking.objects.filter(payment_status='paid').count()
+    total_bookings = totals['paid_count']
     
     # Bookings in selected period
-    period_bookings = Booking.objects.filter(
-        payment_status='paid',
-        payment_date__gte=start_date
-    ).count()
+    period_bookings = totals['period_count'] or 0
     
     # Pending bookings (potential revenue)
-    pending_bookings = Booking.objects.filter(payment_status='pending').count()
-    pending_revenue = Booking.objects.filter(
-        payment_status='pending'
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    pending_bookings = totals['pending_count']
+    pending_revenue = totals['pending_revenue'] or 0
     
     # Failed bookings
-    failed_bookings = Booking.objects.filter(payment_status='failed').count()
+    failed_bookings = totals['failed_count']
     
     # Booking status breakdown
-    booking_status = Booking.objects.values('payment_status').annotate(
-        count=Count('id'),
-        revenue=Sum('amount')
-    ).order_by('-count')
+    booking_status = sorted(
+        (
+            {
+                'payment_status': status,
+                'count': totals[f'{status}_count'],
+                'revenue': totals[f'{status}_revenue'],
+            }
+            for status, _ in Booking.PAYMENT_STATUS_CHOICES
+            if totals[f'{status}_count']
+        ),
+        key=lambda row: -row['count']
+    )
     
+    # Revenue by payment method
+    revenue_by_method = sales.values('payment_method').annotate(
+        total=Sum('revenue'),
+        count=Sum('seats')
+    ).order_by('-total')
     
-    # ========== POPULAR MOVIES ==========
-    # Most popular movies by bookings
-    popular_movies = Booking.objects.filter(
-        payment_status='paid'
-    ).values(
+    
+    # ========== MOVIES, GENRES & LANGUAGES (one grouped pass) ==========
+    movie_rows = list(sales.values(
         'movie__name',
         'movie__id',
         'movie__genre',
         'movie__language'
     ).annotate(
-        total_bookings=Count('id'),
-        revenue=Sum('amount')
-    ).order_by('-total_bookings')[:10]
+        total_bookings=Sum('seats'),
+        revenue=Sum('revenue')
+    ))
+    
+    # Most popular movies by bookings
+    popular_movies = sorted(movie_rows, key=lambda row: -row['total_bookings'])[:10]
     
     # Movies with highest revenue
-    top_revenue_movies = Booking.objects.filter(
-        payment_status='paid'
-    ).values(
-        'movie__name',
-        'movie__id'
-    ).annotate(
-        revenue=Sum('amount'),
-        bookings=Count('id')
-    ).order_by('-revenue')[:10]
+    top_revenue_movies = [
+        {
+            'movie__name': row['movie__name'],
+            'movie__id': row['movie__id'],
+            'revenue': row['revenue'],
+            'bookings': row['total_bookings'],
+        }
+        for row in sorted(movie_rows, key=lambda row: -row['revenue'])[:10]
+    ]
+    
+    # Popular genres and languages, rolled up from the per-movie rows
+    genre_stats = _rollup(movie_rows, 'movie__genre')
+    language_stats = _rollup(movie_rows, 'movie__language')
     
     
     # ========== THEATER METRICS ==========
-    # Busiest theaters
-    busiest_theaters = Booking.objects.filter(
-        payment_status='paid'
-    ).values(
+    theater_rows = list(sales.values(
         'theater__name',
         'theater__id',
         'theater__movie__name'
     ).annotate(
-        total_bookings=Count('id'),
-        revenue=Sum('amount'),
-        occupancy_rate=Count('seat') * 100.0 / Count('theater__seats', distinct=True)
-    ).order_by('-total_bookings')[:10]
+        total_bookings=Sum('seats'),
+        revenue=Sum('revenue')
+    ))
+    
+    # Busiest theaters
+    busiest_theaters = sorted(theater_rows, key=lambda row: -row['total_bookings'])[:10]
+    theater_seat_counts = dict(
+        Seat.objects.filter(
+            theater_id__in=[row['theater__id'] for row in busiest_theaters]
+        ).values_list('theater_id').annotate(total=Count('id'))
+    )
+    for row in busiest_theaters:
+        seats = theater_seat_counts.get(row['theater__id'])
+        row['occupancy_rate'] = row['total_bookings'] * 100.0 / seats if seats else None
     
     # Theater revenue ranking
-    theater_revenue = Booking.objects.filter(
-        payment_status='paid'
-    ).values(
-        'theater__name',
-        'theater__id'
-    ).annotate(
-        revenue=Sum('amount'),
-        bookings=Count('id')
-    ).order_by('-revenue')[:10]
+    theater_revenue = [
+        {
+            'theater__name': row['theater__name'],
+            'theater__id': row['theater__id'],
+            'revenue': row['revenue'],
+            'bookings': row['total_bookings'],
+        }
+        for row in sorted(theater_rows, key=lambda row: -row['revenue'])[:10]
+    ]
     
     
     # ========== USER METRICS ==========
+    user_totals = User.objects.aggregate(
+        total=Count('id', distinct=True),
+        active=Count('id', filter=Q(booking__payment_status='paid'), distinct=True)
+    )
+    
     # Total registered users
-    total_users = User.objects.count()
+    total_users = user_totals['total']
     
     # Active users (made at least one booking)
-    active_users = User.objects.filter(
-        booking__payment_status='paid'
-    ).distinct().count()
+    active_users = user_totals['active']
     
     # Top customers
     top_customers = User.objects.filter(
@@ -139,16 +172,20 @@ def admin_dashboard(request):
     
     
     # ========== SEAT METRICS ==========
+    seat_totals = Seat.objects.aggregate(
+        total=Count('id'),
+        booked=Count('id', filter=Q(is_booked=True)),
+        reserved=Count('id', filter=Q(reserved_until__gt=now))
+    )
+    
     # Total seats
-    total_seats = Seat.objects.count()
+    total_seats = seat_totals['total']
     
     # Booked seats
-    booked_seats = Seat.objects.filter(is_booked=True).count()
+    booked_seats = seat_totals['booked']
     
     # Reserved seats (temporary)
-    reserved_seats = Seat.objects.filter(
-        reserved_until__gt=timezone.now()
-    ).count()
+    reserved_seats = seat_totals['reserved']
     
     # Available seats
     available_seats = total_seats - booked_seats - reserved_seats
@@ -157,62 +194,32 @@ def admin_dashboard(request):
     occupancy_rate = (booked_seats / total_seats * 100) if total_seats > 0 else 0
     
     
-    # ========== GENRE & LANGUAGE ANALYTICS ==========
-    # Popular genres
-    genre_stats = Booking.objects.filter(
-        payment_status='paid'
-    ).values('movie__genre').annotate(
-        bookings=Count('id'),
-        revenue=Sum('amount')
-    ).order_by('-bookings')
-    
-    # Popular languages
-    language_stats = Booking.objects.filter(
-        payment_status='paid'
-    ).values('movie__language').annotate(
-        bookings=Count('id'),
-        revenue=Sum('amount')
-    ).order_by('-bookings')
-    
-    
     # ========== TIME-BASED ANALYTICS ==========
     # Revenue trend (last 7 days)
+    first_day = timezone.localtime(now - timedelta(days=6)).replace(hour=0, minute=0, second=0, microsecond=0)
+    daily = {
+        row['day']: row
+        for row in sales.filter(day__gte=first_day.date()).values('day').annotate(
+            revenue=Sum('revenue'),
+            bookings=Sum('seats')
+        ).order_by()
+    }
     revenue_trend = []
-    for i in range(6, -1, -1):
-        day = timezone.now() - timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        
-        day_revenue = Booking.objects.filter(
-            payment_status='paid',
-            payment_date__gte=day_start,
-            payment_date__lt=day_end
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        day_bookings = Booking.objects.filter(
-            payment_status='paid',
-            payment_date__gte=day_start,
-            payment_date__lt=day_end
-        ).count()
-        
+    for i in range(7):
+        day_start = first_day + timedelta(days=i)
+        row = daily.get(day_start.date(), {})
         revenue_trend.append({
             'date': day_start.strftime('%b %d'),
-            'revenue': float(day_revenue),
-            'bookings': day_bookings
+            'revenue': float(row.get('revenue') or 0),
+            'bookings': row.get('bookings', 0)
         })
     
     
     # ========== CONVERSION METRICS ==========
     # Conversion rate (paid / total bookings)
-    total_all_bookings = Booking.objects.count()
+    total_all_bookings = total_bookings + sum(totals[f'{status}_count'] for status in open_statuses)
     conversion_rate = (total_bookings / total_all_bookings * 100) if total_all_bookings > 0 else 0
     
-    # Average time to payment (for paid bookings)
-    paid_bookings_with_time = Booking.objects.filter(
-        payment_status='paid',
-        payment_date__isnull=False
-    )
-    
     
     context = {
         # Revenue
@@ -264,3 +271,19 @@ def admin_dashboard(request):
     }
     
     return render(request, 'admin/dashboard.html', context)
+
+
+@staff_member_required
+def catalog_cache_stats(request):
+    """Catalog snapshot hit/miss counters for this worker process"""
+    return JsonResponse(catalog_stats())
+
+
+def _rollup(movie_rows, field):
+    """Sum per-movie booking rows into per-genre or per-language rows"""
+    totals = {}
+    for row in movie_rows:
+        entry = totals.setdefault(row[field], {field: row[field], 'bookings': 0, 'revenue': 0})
+        entry['bookings'] += row['total_bookings']
+        entry['revenue'] += row['revenue'] or 0
+    return sorted(totals.values(), key=lambda row: -row['bookings'])
@@ -0,0 +1,114 @@
+"""
+Best-available seat allocation for group bookings.
+
+Works on a SeatMap snapshot, so choosing seats costs no queries. Seats are
+grouped into rows and split into blocks wherever there is an aisle (from the
+show's SeatLayout grid) or a gap in the seat numbering. Every window of
+party_size free seats inside one block is scored by how far its centre sits
+from the middle of the row and how far the row is from the preferred row
+(a little behind the middle of the hall); the lowest score wins.
+
+The chosen ids go straight to the atomic hold path, which still decides
+whether the seats are really free.
+"""
+
+import re
+from functools import lru_cache
+
+from .seat_layout import iter_cells
+
+
+# Preferred row as a fraction of the hall depth from the screen
+PREFERRED_ROW = 0.6
+
+# How much one row of distance from the preferred row costs compared with
+# being one full half-row off centre
+ROW_WEIGHT = 0.8
+
+_LABEL_RE = re.compile(r'^([A-Za-z]+)\s*(\d+)$')
+
+
+def _row_key(label):
+    """Sort key for row letters: A < B < ... < Z < AA"""
+    return (len(label), label.upper())
+
+
+def seat_rows(seat_map, grid=None):
+    """
+    Rows of seat blocks as lists of (seat index, x position), front row first.
+
+    With a layout grid, x is the grid column and aisles split blocks; without
+    one, x is the seat number and a jump in numbering splits blocks. The
+    result only depends on the labels and grid, so it is memoized.
+    """
+    return _seat_rows(tuple(seat_map.labels), grid or '')
+
+
+@lru_cache(maxsize=256)
+def _seat_rows(labels, grid):
+    columns = {cell.seat_number: cell.column for cell in iter_cells(grid)} if grid else {}
+
+    rows = {}
+    for index, label in enumerate(labels):
+        match = _LABEL_RE.match(label or '')
+        if not match:
+            continue
+        row_label, number = match.group(1).upper(), int(match.group(2))
+        rows.setdefault(row_label, []).append((number, index))
+
+    result = []
+    for row_label in sorted(rows, key=_row_key):
+        seats = sorted(rows[row_label])
+        blocks = []
+        block = []
+        previous_x = None
+        for number, index in seats:
+            x = columns.get(f'{row_label}{number}', number)
+            if previous_x is not None and x != previous_x + 1:
+                blocks.append(block)
+                block = []
+            block.append((index, x))
+            previous_x = x
+        if block:
+            blocks.append(block)
+        result.append(tuple(tuple(block) for block in blocks))
+    return tuple(result)
+
+
+def best_available(seat_map, party_size, grid=None, now=None):
+    """
+    Seat ids of the best block of party_size adjacent free seats, or [] if
+    no row has enough seats together.
+    """
+    if party_size < 1:
+        return []
+    taken = seat_map.booked_bits | seat_map.held_bits(now)
+    rows = seat_rows(seat_map, grid)
+    preferred_row = (len(rows) - 1) * PREFERRED_ROW
+
+    best = None
+    for row_index, blocks in enumerate(rows):
+        positions = [x for block in blocks for _, x in block]
+        if not positions:
+            continue
+        row_centre = (min(positions) + max(positions)) / 2
+        half_width = max((max(positions) - min(positions)) / 2, 1)
+        row_cost = ROW_WEIGHT * abs(row_index - preferred_row)
+        if best is not None and row_cost >= best[0]:
+            continue
+
+        for block in blocks:
+            run = 0
+            for position, (index, x) in enumerate(block):
+                run = run + 1 if not taken >> index & 1 else 0
+                if run < party_size:
+                    continue
+                window = block[position - party_size + 1:position + 1]
+                centre = (window[0][1] + window[-1][1]) / 2
+                score = row_cost + abs(centre - row_centre) / half_width
+                if best is None or score < best[0]:
+                    best = (score, window)
+
+    if best is None:
+        return []
+    return [seat_map.seat_ids[index] for index, _ in best[1]]
@@ -0,0 +1,360 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Theater, Seat, Booking
+from .allocator import best_available
+from .seat_map import build_seat_map, get_seat_map, invalidate_seat_maps
+from .sales_rollup import record_sales
+
+
+HOLD_MINUTES = 5
+HISTORY_PAGE_SIZE = 50
+
+# Largest group the best-available allocator will seat together
+MAX_PARTY_SIZE = 10
+
+# Session keys used between seat selection and payment
+PENDING_SESSION_KEYS = ('pending_booking_ids', 'theater_id', 'reservation_expiry')
+
+
+class HoldResult:
+    """Outcome of a bulk seat hold: ids of the seats claimed and (seat_number, reason) pairs lost"""
+    def __init__(self, held=None, lost=None, reserved_until=None):
+        self.held = held or []
+        self.lost = lost or []
+        self.reserved_until = reserved_until
+        self.bookings = []
+
+    @property
+    def ok(self):
+        return not self.lost
+
+    def lost_labels(self):
+        """Human readable list such as ['A1 (booked)', 'A2 (reserved)']"""
+        return [f'{seat_number} ({reason})' for seat_number, reason in self.lost]
+
+
+def free_seat_q(now=None):
+    """Q object matching seats that are neither booked nor under a live hold"""
+    now = now or timezone.now()
+    return Q(is_booked=False) & (Q(reserved_until__isnull=True) | Q(reserved_until__lt=now))
+
+
+def remember_pending_booking(session, bookings, theater_id, expiry):
+    """Keep what the payment steps need in the session (one session save)"""
+    session['pending_booking_ids'] = [b.id for b in bookings]
+    session['theater_id'] = theater_id
+    session['reservation_expiry'] = expiry.isoformat()
+
+
+def forget_pending_booking(session):
+    """Drop the booking flow keys; the session is only saved if any were set"""
+    for key in PENDING_SESSION_KEYS:
+        session.pop(key, None)
+
+
+def upcoming_shows(movie_id, now=None):
+    """
+    A movie's shows that have not started yet, ordered by time, with seat
+    counts (seat_total, booked_count, held_count, available_count) annotated
+    in the same query.
+    """
+    now = now or timezone.now()
+    return Theater.objects.filter(movie_id=movie_id, time__gte=now).annotate(
+        seat_total=Count('seats'),
+        booked_count=Count('seats', filter=Q(seats__is_booked=True)),
+        held_count=Count('seats', filter=Q(seats__is_booked=False, seats__reserved_until__gte=now)),
+    ).annotate(
+        available_count=F('seat_total') - F('booked_count') - F('held_count'),
+    ).order_by('time', 'id')
+
+
+def parse_seat_ids(raw_ids):
+    """Turn posted seat ids into a de-duplicated list of ints, ignoring junk"""
+    seat_ids = []
+    for raw in raw_ids:
+        try:
+            seat_id = int(raw)
+        except (TypeError, ValueError):
+            continue
+        if seat_id not in seat_ids:
+            seat_ids.append(seat_id)
+    return seat_ids
+
+
+def hold_seats(theater, seat_ids, user, minutes=HOLD_MINUTES):
+    """
+    Claim all requested seats for a user or none of them.
+
+    The claim is a single conditional UPDATE, so two requests racing for the
+    same seat can never both win it. If any seat is lost the transaction is
+    rolled back and the result lists every seat that could not be held.
+
+    Args:
+        theater: Theater the seats belong to
+        seat_ids: List of Seat primary keys
+        user: User placing the hold
+        minutes: Length of the hold
+
+    Returns:
+        HoldResult
+    """
+    now = timezone.now()
+    reserved_until = now + timedelta(minutes=minutes)
+    seat_ids = list(seat_ids)
+
+    with transaction.atomic():
+        claimed = Seat.objects.filter(
+            free_seat_q(now), theater=theater, id__in=seat_ids
+        ).update(reserved_by=user, reserved_until=reserved_until, version=F('version') + 1)
+
+        if claimed == len(seat_ids):
+            invalidate_seat_maps([theater.id])
+            return HoldResult(held=seat_ids, reserved_until=reserved_until)
+
+        # Work out exactly which seats we did not get, then undo the partial claim
+        rows = Seat.objects.filter(theater=theater, id__in=seat_ids).values_list(
+            'id', 'seat_number', 'is_booked', 'reserved_by_id', 'reserved_until'
+        )
+        lost = []
+        found = set()
+        for seat_id, seat_number, is_booked, reserved_by_id, until in rows:
+            found.add(seat_id)
+            if is_booked:
+                lost.append((seat_number, 'booked'))
+            elif not (reserved_by_id == user.pk and until == reserved_until):
+                lost.append((seat_number, 'reserved'))
+        for seat_id in seat_ids:
+            if seat_id not in found:
+                lost.append((str(seat_id), 'unavailable'))
+
+        transaction.set_rollback(True)
+
+    return HoldResult(lost=lost)
+
+
+def release_holds(seat_ids, user):
+    """Drop the user's live holds on the given seats in one UPDATE"""
+    held = Seat.objects.filter(id__in=list(seat_ids), reserved_by=user, is_booked=False)
+    with transaction.atomic():
+        invalidate_seat_maps(held.values_list('theater_id', flat=True).distinct())
+        return held.update(reserved_by=None, reserved_until=None, version=F('version') + 1)
+
+
+def create_pending_bookings(user, theater, seat_ids, amount=None):
+    """
+    Create the pending bookings for freshly held seats with one bulk INSERT.
+
+    Any pending booking still attached to one of these seats belongs to a hold
+    that has lapsed (otherwise the seat could not have been claimed), so it is
+    removed first to keep the one-booking-per-seat constraint satisfied.
+
+    Without an explicit amount each seat is priced by its layout tier, falling
+    back to DEFAULT_TICKET_PRICE.
+    """
+    seat_ids = list(seat_ids)
+    prices = dict.fromkeys(seat_ids, amount)
+    if amount is None:
+        prices = seat_prices(theater, seat_ids)
+
+    Booking.objects.filter(seat_id__in=seat_ids, payment_status='pending').delete()
+    return Booking.objects.bulk_create([
+        Booking(
+            user=user,
+            seat_id=seat_id,
+            movie_id=theater.movie_id,
+            theater=theater,
+            payment_status='pending',
+            amount=prices[seat_id],
+        )
+        for seat_id in seat_ids
+    ])
+
+
+def seat_prices(theater, seat_ids):
+    """Seat id -> ticket price from the theater layout's price tiers"""
+    default = getattr(settings, 'DEFAULT_TICKET_PRICE', 250.00)
+    if not theater.layout_id:
+        return dict.fromkeys(seat_ids, default)
+    tier_prices = theater.layout.tier_prices()
+    tiers = Seat.objects.filter(id__in=seat_ids).values_list('id', 'price_tier')
+    prices = dict.fromkeys(seat_ids, default)
+    prices.update((seat_id, tier_prices.get(tier, default)) for seat_id, tier in tiers)
+    return prices
+
+
+def reserve_seats(theater, seat_ids, user, minutes=HOLD_MINUTES, amount=None):
+    """Hold the seats and create their pending bookings in a single transaction"""
+    with transaction.atomic():
+        hold = hold_seats(theater, seat_ids, user, minutes=minutes)
+        if hold.ok:
+            hold.bookings = create_pending_bookings(user, theater, hold.held, amount=amount)
+    return hold
+
+
+def reserve_best_available(theater, party_size, user, minutes=HOLD_MINUTES, attempts=3):
+    """
+    Pick the best block of party_size adjacent seats and hold it.
+
+    The first pick uses the cached seat map; if another user wins any of the
+    seats in the meantime the pick is redone on a fresh read, up to
+    ``attempts`` times.
+
+    Returns:
+        HoldResult, or None when no row has party_size free seats together
+    """
+    grid = theater.layout.grid if theater.layout_id else None
+    seat_map = get_seat_map(theater.id)
+    hold = None
+    for _ in range(attempts):
+        seat_ids = best_available(seat_map, party_size, grid)
+        if not seat_ids:
+            return None
+        hold = reserve_seats(theater, seat_ids, user, minutes=minutes)
+        if hold.ok:
+            return hold
+        seat_map = build_seat_map(theater.id)
+    return hold
+
+
+def confirm_bookings(bookings, payment_id, payment_method):
+    """
+    Mark pending bookings as paid and their seats as booked.
+
+    Both flips are single UPDATE ... WHERE id IN statements inside one
+    transaction. If any booking is no longer pending (e.g. it was reaped
+    after expiring) or any seat is already booked, nothing is changed and
+    False is returned.
+
+    Args:
+        bookings: List of pending Booking objects
+        payment_id: Gateway payment reference
+        payment_method: razorpay, stripe, etc.
+    """
+    booking_ids = [booking.id for booking in bookings]
+    seat_ids = [booking.seat_id for booking in bookings]
+    payment_date = timezone.now()
+
+    with transaction.atomic():
+        updated = Booking.objects.filter(
+            id__in=booking_ids, payment_status='pending'
+        ).update(
+            payment_status='paid',
+            payment_id=payment_id,
+            payment_method=payment_method,
+            payment_date=payment_date,
+        )
+        if updated != len(booking_ids):
+            transaction.set_rollback(True)
+            return False
+
+        # Seats booked by anyone else in the meantime make the whole order fail
+        booked = Seat.objects.filter(id__in=seat_ids, is_booked=False).update(
+            is_booked=True, reserved_by=None, reserved_until=None, version=F('version') + 1
+        )
+        if booked != len(seat_ids):
+            transaction.set_rollback(True)
+            return False
+        invalidate_seat_maps(booking.theater_id for booking in bookings)
+        record_sales(bookings, payment_method, payment_date)
+
+    # Keep the in-memory objects in step with the rows for the caller
+    for booking in bookings:
+        booking.payment_status = 'paid'
+        booking.payment_id = payment_id
+        booking.payment_method = payment_method
+        booking.payment_date = payment_date
+    return True
+
+
+def cancel_pending_bookings(booking_ids, user):
+    """Delete a user's pending bookings and release their seat holds"""
+    with transaction.atomic():
+        pending = Booking.objects.filter(id__in=list(booking_ids), user=user, payment_status='pending')
+        seat_ids = list(pending.values_list('seat_id', flat=True))
+        release_holds(seat_ids, user)
+        count, _ = pending.delete()
+    return count
+
+
+class BookingGroup:
+    """Bookings from one order for one show, rendered as a single card"""
+    def __init__(self, first):
+        self.movie = first.movie
+        self.theater = first.theater
+        self.booked_at = first.booked_at
+        self.payment_status = first.payment_status
+        self.payment_id = first.payment_id
+        self.bookings = [first]
+
+    def accepts(self, booking):
+        return (booking.theater_id == self.theater.id and
+                booking.payment_status == self.payment_status and
+                booking.payment_id == self.payment_id)
+
+    @property
+    def seats(self):
+        return [booking.seat.seat_number for booking in reversed(self.bookings)]
+
+    @property
+    def amount(self):
+        return sum(booking.amount for booking in self.bookings)
+
+
+def _history_rows(bookings, before, before_id, limit):
+    """Next rows of the history strictly after the (booked_at, id) cursor"""
+    if before is not None and before_id is not None:
+        bookings = bookings.filter(Q(booked_at__lt=before) | Q(booked_at=before, id__lt=before_id))
+    return list(bookings.order_by('-booked_at', '-id')[:limit])
+
+
+def _finish_group(group, bookings, chunk_size):
+    """Append the rest of an order that overflowed a page; True if older bookings follow it"""
+    while True:
+        last = group.bookings[-1]
+        rows = _history_rows(bookings, last.booked_at, last.id, chunk_size)
+        for booking in rows:
+            if not group.accepts(booking):
+                return True
+            group.bookings.append(booking)
+        if len(rows) < chunk_size:
+            return False
+
+
+def booking_history(user, before=None, before_id=None, page_size=HISTORY_PAGE_SIZE):
+    """
+    One page of a user's bookings, newest first, grouped by order.
+
+    Uses a single joined query with keyset pagination on (booked_at, id), so
+    the cost of a page does not grow with the length of the history. A group
+    cut off by the page boundary is pushed to the next page whole; an order
+    larger than a whole page is finished on its page instead, which then
+    holds more than page_size bookings.
+
+    Returns:
+        (groups, cursor) where cursor is the (booked_at, id) to pass as
+        before/before_id for the next page, or None on the last page
+    """
+    bookings = Booking.objects.filter(user=user).select_related('movie', 'theater', 'seat')
+    rows = _history_rows(bookings, before, before_id, page_size + 1)
+
+    groups = []
+    for booking in rows[:page_size]:
+        if groups and groups[-1].accepts(booking):
+            groups[-1].bookings.append(booking)
+        else:
+            groups.append(BookingGroup(booking))
+
+    if len(rows) <= page_size:
+        return groups, None
+    if groups[-1].accepts(rows[page_size]):
+        if len(groups) > 1:
+            groups.pop()
+        elif not _finish_group(groups[-1], bookings, page_size):
+            return groups, None
+    last = groups[-1].bookings[-1]
+    return groups, (last.booked_at, last.id)
@@ -0,0 +1,171 @@
+"""
+Precomputed movie catalog for the listing and home pages.
+
+The whole catalog is small and only changes on admin edits, so it is built
+once into lightweight CatalogMovie tuples (display names and image URL
+already resolved) plus genre/language facet counts, and filtered in memory.
+Text search goes to the full-text index (movies.search) and maps the ranked
+ids back onto the snapshot.
+
+Each process keeps its own copy tagged with a catalog version stored in the
+shared cache. Saving or deleting a Movie replaces that version with a fresh
+random token after commit (not incr, which FileBasedCache does as get + set),
+so every worker rebuilds on its next request. Hit/miss counters are per process.
+"""
+
+import threading
+import uuid
+from collections import Counter, namedtuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Movie
+from .search import search_movie_ids, search_vocabulary
+from .suggest import SuggestIndex
+
+
+VERSION_KEY = 'catalog:version'
+
+CatalogImage = namedtuple('CatalogImage', ['url'])
+
+# Same attribute names the templates use on Movie
+CatalogMovie = namedtuple('CatalogMovie', [
+    'id', 'name', 'image', 'rating', 'cast', 'description',
+    'genre', 'language', 'trailer_url', 'get_genre_display', 'get_language_display',
+])
+
+
+class Catalog:
+    """Snapshot of every movie plus facet counts"""
+    def __init__(self, version, movies):
+        self.version = version
+        self.movies = movies
+        self.genre_counts = Counter(movie.genre for movie in movies)
+        self.language_counts = Counter(movie.language for movie in movies)
+        self.by_id = {movie.id: movie for movie in movies}
+        self._vocabulary = None
+        self._suggestions = None
+
+    @property
+    def vocabulary(self):
+        """Words from names and cast, used to correct misspelled search terms"""
+        if self._vocabulary is None:
+            self._vocabulary = search_vocabulary(self.movies)
+        return self._vocabulary
+
+    @property
+    def suggestions(self):
+        """Autocomplete trie over titles and cast, built on first use"""
+        if self._suggestions is None:
+            self._suggestions = SuggestIndex.build(self.movies)
+        return self._suggestions
+
+    def search(self, query):
+        """Movies matching a full-text query, best match first"""
+        ids = search_movie_ids(query, limit=len(self.movies) or 1, vocabulary=self.vocabulary)
+        return [self.by_id[movie_id] for movie_id in ids if movie_id in self.by_id]
+
+    def filter(self, search=None, genre=None, language=None):
+        """Full-text search ranked by relevance, then the genre / language filters"""
+        movies = self.movies
+        if search:
+            movies = self.search(search)
+        if genre:
+            movies = [m for m in movies if m.genre == genre]
+        if language:
+            movies = [m for m in movies if m.language == language]
+        return movies
+
+
+_lock = threading.Lock()
+_catalog = None
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _image_url(movie):
+    try:
+        return movie.image.url if movie.image else ''
+    except ValueError:
+        return ''
+
+
+def _build(version):
+    movies = [
+        CatalogMovie(
+            id=movie.id,
+            name=movie.name,
+            image=CatalogImage(_image_url(movie)),
+            rating=movie.rating,
+            cast=movie.cast,
+            description=movie.description,
+            genre=movie.genre,
+            language=movie.language,
+            trailer_url=movie.trailer_url,
+            get_genre_display=movie.get_genre_display(),
+            get_language_display=movie.get_language_display(),
+        )
+        for movie in Movie.objects.order_by('id')
+    ]
+    return Catalog(version, movies)
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # A random seed, so a version lost to eviction is never reused
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def acatalog_version():
+    """Async catalog_version"""
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def get_catalog():
+    """The current catalog snapshot, rebuilt only when the version has moved"""
+    global _catalog
+    version = catalog_version()
+    current = _catalog
+    if current is not None and current.version == version:
+        _stats['hits'] += 1
+        return current
+
+    with _lock:
+        if _catalog is not None and _catalog.version == version:
+            _stats['hits'] += 1
+            return _catalog
+        _stats['misses'] += 1
+        _catalog = _build(version)
+        return _catalog
+
+
+async def aget_catalog():
+    """Async get_catalog; only a rebuild leaves the event loop"""
+    version = await acatalog_version()
+    current = _catalog
+    if current is not None and current.version == version:
+        _stats['hits'] += 1
+        return current
+    return await sync_to_async(get_catalog)()
+
+
+def invalidate_catalog():
+    """Move the catalog to a new version once the current transaction commits"""
+    def bump():
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def catalog_stats():
+    """Hit/miss counters for this process and the size of the cached snapshot"""
+    current = _catalog
+    return dict(_stats, movies=len(current.movies) if current else 0, version=current.version if current else None)
@@ -0,0 +1,40 @@
+"""
+System checks for deployment settings the caching code relies on.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Catalog and seat map versions are bumped in the cache of the process that
+    made the write; with LocMemCache other workers never see the bump and keep
+    serving (and answering 304 for) stale pages.
+    """
+    if settings.CACHES.get('default', {}).get('BACKEND') != LOCMEM_BACKEND:
+        return []
+    hint = 'Use the default FileBasedCache or a Redis cache via CACHE_BACKEND/CACHE_LOCATION.'
+    try:
+        workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    except ValueError:
+        workers = 1
+    if workers > 1:
+        return [Error(
+            f'LocMemCache is per process but WEB_CONCURRENCY={workers}.',
+            hint=hint,
+            id='movies.E001',
+        )]
+    if not settings.DEBUG:
+        return [Warning(
+            'LocMemCache is per process: catalog and seat map updates are not seen by other workers.',
+            hint=hint,
+            id='movies.W001',
+        )]
+    return []
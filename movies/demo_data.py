@@ -6,6 +6,8 @@ This provides hardcoded data to showcase the application without database writes
 from datetime import datetime, timedelta
 from django.utils import timezone
 
+from .seat_layout import iter_cells, uniform_grid
+
 # Demo Movies Data
 DEMO_MOVIES = [
     {
@@ -130,26 +132,22 @@ DEMO_THEATERS = {
 def generate_demo_seats(theater_id, total_seats, booked_count):
     """Generate demo seats for a theater"""
     seats = []
-    rows = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
-    seats_per_row = total_seats // len(rows)
+    grid = uniform_grid(8, total_seats // 8)
     
-    seat_number = 1
     booked_so_far = 0
     
-    for row in rows:
-        for col in range(1, seats_per_row + 1):
-            is_booked = booked_so_far < booked_count and (seat_number % 3 == 0 or seat_number % 5 == 0)
-            if is_booked:
-                booked_so_far += 1
-            
-            seats.append({
-                'id': seat_number,
-                'seat_number': f'{row}{col}',
-                'row': row,
-                'is_booked': is_booked,
-                'theater_id': theater_id
-            })
-            seat_number += 1
+    for seat_id, cell in enumerate(iter_cells(grid), start=1):
+        is_booked = booked_so_far < booked_count and (seat_id % 3 == 0 or seat_id % 5 == 0)
+        if is_booked:
+            booked_so_far += 1
+        
+        seats.append({
+            'id': seat_id,
+            'seat_number': cell.seat_number,
+            'row': cell.row_label,
+            'is_booked': is_booked,
+            'theater_id': theater_id
+        })
     
     return seats
 
@@ -1,20 +1,38 @@
-from django.core.mail import send_mail, EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+from functools import lru_cache
+
+from django.core.mail import send_mail, EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django.utils import timezone
 from django.conf import settings
 
+from .models import Booking, EmailJob
 
-def send_booking_confirmation_email(user, bookings, theater):
+
+# Per-message outcome of a batch send
+MailResult = namedtuple('MailResult', ['to', 'sent', 'error'])
+
+
+@lru_cache(maxsize=None)
+def confirmation_templates():
+    """Compiled (html, text) confirmation templates, loaded once per process"""
+    return (
+        get_template('emails/booking_confirmation.html'),
+        get_template('emails/booking_confirmation.txt'),
+    )
+
+
+def build_booking_confirmation_email(user, bookings, theater, connection=None):
     """
-    Send booking confirmation email to user with ticket details.
+    Build the booking confirmation message without sending it.
     
-    Args:
-        user: User object who made the booking
-        bookings: List of Booking objects
-        theater: Theater object for the show
+    Returns:
+        EmailMultiAlternatives, or None if the user has no email address
     """
     if not user.email:
-        return False
+        return None
     
     # Get booking details
     seats = [booking.seat.seat_number for booking in bookings]
@@ -34,18 +52,35 @@ def send_booking_confirmation_email(user, bookings, theater):
         'bookings': bookings,
     }
     
-    # Render HTML email
-    html_content = render_to_string('emails/booking_confirmation.html', context)
-    text_content = strip_tags(html_content)
+    # Render both parts from the precompiled templates
+    html_template, text_template = confirmation_templates()
+    html_content = html_template.render(context)
+    text_content = text_template.render(context)
     
     # Create email
     email = EmailMultiAlternatives(
         subject=subject,
         body=text_content,
         from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@bookmyseat.com',
-        to=[user.email]
+        to=[user.email],
+        connection=connection,
     )
     email.attach_alternative(html_content, "text/html")
+    return email
+
+
+def send_booking_confirmation_email(user, bookings, theater):
+    """
+    Send booking confirmation email to user with ticket details.
+    
+    Args:
+        user: User object who made the booking
+        bookings: List of Booking objects
+        theater: Theater object for the show
+    """
+    email = build_booking_confirmation_email(user, bookings, theater)
+    if email is None:
+        return False
     
     try:
         email.send()
@@ -53,3 +88,155 @@ def send_booking_confirmation_email(user, bookings, theater):
     except Exception as e:
         print(f"Error sending email: {e}")
         return False
+
+
+def send_booking_confirmations(confirmations, connection=None):
+    """
+    Send many booking confirmations over one mail connection.
+    
+    Args:
+        confirmations: Iterable of (user, bookings, theater) tuples
+        connection: Open backend connection to reuse (default: a new one
+            opened for the batch)
+    
+    Returns:
+        List of MailResult, one per confirmation and in the same order.
+        Users without an email address are reported as not sent.
+    """
+    own_connection = connection is None
+    connection = connection or get_connection()
+    results = []
+    try:
+        connection.open()
+        connect_error = None
+    except Exception as e:
+        # Mail server unreachable: report every message as failed
+        connect_error = e
+    
+    try:
+        for user, bookings, theater in confirmations:
+            if connect_error is not None:
+                results.append(MailResult(user.email, False, str(connect_error)))
+                continue
+            try:
+                email = build_booking_confirmation_email(user, bookings, theater, connection=connection)
+                if email is None:
+                    results.append(MailResult('', False, 'no email address'))
+                    continue
+                email.send()
+            except Exception as e:
+                results.append(MailResult(user.email, False, str(e)))
+            else:
+                results.append(MailResult(user.email, True, ''))
+    finally:
+        if own_connection:
+            connection.close()
+    return results
+
+
+def paid_confirmations_for_show(theater):
+    """(user, bookings, theater) for every paid order of a show, for bulk resends"""
+    bookings = Booking.objects.filter(
+        theater=theater, payment_status='paid'
+    ).select_related('user', 'seat', 'movie').order_by('user_id', 'payment_id', 'id')
+    
+    orders = {}
+    for booking in bookings:
+        orders.setdefault((booking.user_id, booking.payment_id), []).append(booking)
+    return [(group[0].user, group, theater) for group in orders.values()]
+
+
+# ---------- Outbox ----------
+
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_BASE_SECONDS = 30
+EMAIL_RETRY_MAX_SECONDS = 3600
+
+
+def queue_booking_confirmation(user, bookings, theater):
+    """
+    Record a confirmation email in the outbox.
+    
+    Call inside the payment transaction: the job becomes visible to the
+    worker exactly when the payment commits, and is never lost if the
+    process dies before sending.
+    """
+    if not user.email:
+        return None
+    return EmailJob.objects.create(
+        user=user,
+        theater=theater,
+        booking_ids=[booking.id for booking in bookings],
+    )
+
+
+def claim_email_jobs(batch_size):
+    """
+    Claim up to batch_size due jobs for this worker.
+    
+    Claiming pushes next_attempt_at out by a lease and stamps a token in one
+    conditional UPDATE, so concurrent workers never pick the same job and a
+    crashed worker's jobs become due again once the lease runs out.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due_ids = list(
+        EmailJob.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not due_ids:
+        return []
+    EmailJob.objects.filter(
+        id__in=due_ids, status='pending', next_attempt_at__lte=now
+    ).update(claim_token=token, next_attempt_at=now + timedelta(seconds=EMAIL_RETRY_MAX_SECONDS))
+    return list(EmailJob.objects.filter(claim_token=token, status='pending').select_related('user', 'theater'))
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 60s, 120s, ... capped at an hour"""
+    return timedelta(seconds=min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS))
+
+
+def process_email_jobs(batch_size=50, max_attempts=EMAIL_MAX_ATTEMPTS):
+    """
+    Send one batch of queued confirmations over a single SMTP connection.
+    
+    Returns:
+        (sent, retried, failed) counts for the batch
+    """
+    jobs = claim_email_jobs(batch_size)
+    if not jobs:
+        return 0, 0, 0
+    
+    bookings_by_id = Booking.objects.filter(
+        id__in=[booking_id for job in jobs for booking_id in job.booking_ids]
+    ).select_related('seat', 'movie').in_bulk()
+    
+    confirmations = [
+        (job.user, [bookings_by_id[i] for i in job.booking_ids if i in bookings_by_id], job.theater)
+        for job in jobs
+    ]
+    results = send_booking_confirmations(confirmations)
+    
+    sent = retried = failed = 0
+    now = timezone.now()
+    for job, result in zip(jobs, results):
+        job.attempts += 1
+        if result.sent or not result.to:
+            # Sent, or nothing to send to: either way the job is done
+            job.status = 'sent'
+            job.sent_at = now
+            job.last_error = result.error
+            sent += 1
+        elif job.attempts >= max_attempts:
+            job.status = 'failed'
+            job.last_error = result.error
+            failed += 1
+        else:
+            job.next_attempt_at = now + retry_delay(job.attempts)
+            job.last_error = result.error
+            retried += 1
+    
+    EmailJob.objects.bulk_update(jobs, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, retried, failed
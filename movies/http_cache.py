@@ -0,0 +1,151 @@
+"""
+Conditional GET and Cache-Control for the read-only catalog pages.
+
+ETags are built from the version stamps the caches already keep: the catalog
+version (moved by Movie save/delete) and each show's seat map version (moved
+by seat, hold, booking and Theater writes). A show listing hashes its stamps
+into a fixed-length tag, since a movie can have hundreds of upcoming shows and
+browsers echo the tag back in If-None-Match. Building an ETag costs at most one
+small query plus a cache get_many, so an unchanged page is answered with a
+304 before the view renders anything.
+
+Anonymous responses are public so browsers and a CDN can reuse them;
+logged-in pages carry the user's name and a CSRF token, so they are private
+and revalidated on every request. Demo deployments serve static data and are
+cached for much longer, with Last-Modified taken from the demo data module.
+
+Async views get the same treatment: the validators (which may query the
+database and load the user) are computed in a worker thread before the view
+coroutine runs.
+"""
+
+import hashlib
+import os
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import demo_data
+from .catalog import catalog_version
+from .models import Theater
+from .seat_map import get_seat_map_versions
+
+
+HTTP_CACHE_MAX_AGE = 60
+DEMO_HTTP_CACHE_MAX_AGE = 3600
+
+# Hold expiry and shows starting change listing counts without a version bump,
+# so listing ETags also roll over at least this often
+LISTING_ETAG_WINDOW = 60
+
+IS_DEMO_MODE = os.environ.get('VERCEL', False) or not os.access(settings.BASE_DIR, os.W_OK)
+
+
+def _demo_modified():
+    return os.path.getmtime(demo_data.__file__)
+
+
+def _has_messages(request):
+    """Pending flash messages make a response one-off"""
+    return hasattr(request, '_messages') and len(get_messages(request)) > 0
+
+
+def _viewer(request):
+    user = getattr(request, 'user', None)
+    return f'u{user.pk}' if user is not None and user.is_authenticated else 'anon'
+
+
+def catalog_etag(request, *args, **kwargs):
+    """Stamp for pages built from the catalog snapshot alone (home, movie_list)"""
+    if IS_DEMO_MODE:
+        return f'demo-{int(_demo_modified())}'
+    return f'catalog-{catalog_version()}'
+
+
+def show_listing_etag(request, movie_id):
+    """Stamp for a movie's show listing: catalog version plus each upcoming show's seat map version"""
+    if IS_DEMO_MODE:
+        return f'demo-{int(_demo_modified())}-{movie_id}'
+    window = int(time.time() // LISTING_ETAG_WINDOW)
+    theater_ids = list(Theater.objects.filter(
+        movie_id=movie_id, time__gte=timezone.now()
+    ).order_by('id').values_list('id', flat=True))
+    versions = get_seat_map_versions(theater_ids)
+    stamps = '.'.join(f'{theater_id}:{versions[theater_id]}' for theater_id in theater_ids)
+    digest = hashlib.sha1(f'{catalog_version()}-{window}-{stamps}'.encode()).hexdigest()
+    return f'shows-{digest}'
+
+
+def set_cache_headers(request, response):
+    """Cache-Control for a rendered or 304 page depending on who is asking"""
+    patch_vary_headers(response, ['Cookie'])
+    if IS_DEMO_MODE:
+        max_age = getattr(settings, 'DEMO_HTTP_CACHE_MAX_AGE', DEMO_HTTP_CACHE_MAX_AGE)
+        patch_cache_control(response, public=True, max_age=max_age)
+    elif _viewer(request) == 'anon' and not _has_messages(request):
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'HTTP_CACHE_MAX_AGE', HTTP_CACHE_MAX_AGE))
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+
+
+def cached_page(etag_func):
+    """
+    Answer GET/HEAD with 304 when the page's version stamp is unchanged and
+    set Cache-Control on 200/304 responses.
+
+    Args:
+        etag_func: (request, *args, **kwargs) -> version stamp, or None to skip
+    """
+    def page_etag(request, *args, **kwargs):
+        if _has_messages(request):
+            return None
+        stamp = etag_func(request, *args, **kwargs)
+        return f'{stamp}-{_viewer(request)}' if stamp else None
+
+    def page_last_modified(request, *args, **kwargs):
+        if IS_DEMO_MODE:
+            return datetime.fromtimestamp(_demo_modified(), tz=dt_timezone.utc)
+        return None
+
+    def validators(request, *args, **kwargs):
+        return page_etag(request, *args, **kwargs), page_last_modified(request, *args, **kwargs)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_cached_page(view, validators)
+
+        conditional_view = condition(etag_func=page_etag, last_modified_func=page_last_modified)(view)
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                set_cache_headers(request, response)
+            return response
+        return wrapped
+    return decorator
+
+
+def _async_cached_page(view, validators):
+    # condition() calls its validator functions synchronously, so hand it
+    # values already computed off the event loop
+    conditional_view = condition(
+        etag_func=lambda request, *args, **kwargs: request._page_validators[0],
+        last_modified_func=lambda request, *args, **kwargs: request._page_validators[1],
+    )(view)
+
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        request._page_validators = await sync_to_async(validators)(request, *args, **kwargs)
+        response = await conditional_view(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+            await sync_to_async(set_cache_headers)(request, response)
+        return response
+    return wrapped
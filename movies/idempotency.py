@@ -0,0 +1,95 @@
+"""
+Idempotency keys for payment confirmation.
+
+The first request with a key inserts a PaymentIdempotencyKey row (the unique
+(user, key) constraint decides the winner) and runs the confirmation; its
+JSON result is stored in the same transaction as the Booking/Seat updates.
+Later requests with the same key get that stored result back without
+touching bookings, seats or the email outbox. A request that reuses a key
+with different parameters, or arrives while the first is still running, is
+rejected. If the first request dies before completing, its lock lapses after
+IDEMPOTENCY_LOCK_SECONDS and a retry may take the key over. Failed attempts
+change nothing and are abandoned rather than stored, so they can be retried.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import PaymentIdempotencyKey
+
+
+IDEMPOTENCY_LOCK_SECONDS = 60
+IDEMPOTENCY_TTL_HOURS = 24
+
+
+class IdempotencyConflict(Exception):
+    """The key cannot be used for this request right now"""
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def request_fingerprint(**params):
+    """Stable hash of the parameters a key was first used with"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def begin_idempotent_request(user, key, fingerprint, now=None):
+    """
+    Claim an idempotency key.
+
+    Returns:
+        (record, stored_response): stored_response is the earlier result when
+        the key has already completed, otherwise None and the caller must run
+        the request and call complete_idempotent_request()
+
+    Raises:
+        IdempotencyConflict: different parameters (422) or still in progress (409)
+    """
+    now = now or timezone.now()
+    locked_until = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+    try:
+        with transaction.atomic():
+            record = PaymentIdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=fingerprint, locked_until=locked_until
+            )
+        return record, None
+    except IntegrityError:
+        pass
+
+    record = PaymentIdempotencyKey.objects.get(user=user, key=key)
+    if record.fingerprint != fingerprint:
+        raise IdempotencyConflict('Idempotency key was already used for a different payment', 422)
+    if record.status == 'completed':
+        return record, record.response
+
+    # Take over only if the request holding the key has stopped renewing it
+    taken = PaymentIdempotencyKey.objects.filter(
+        pk=record.pk, status='processing', locked_until__lt=now
+    ).update(locked_until=locked_until)
+    if not taken:
+        raise IdempotencyConflict('A request with this idempotency key is still being processed', 409)
+    return record, None
+
+
+def complete_idempotent_request(record, response):
+    """Store the final result; call inside the transaction that did the work"""
+    PaymentIdempotencyKey.objects.filter(pk=record.pk).update(
+        status='completed', response=response, locked_until=None
+    )
+
+
+def abandon_idempotent_request(record):
+    """Free the key after an unexpected error so the client can retry"""
+    PaymentIdempotencyKey.objects.filter(pk=record.pk, status='processing').delete()
+
+
+def purge_idempotency_keys(max_age=None):
+    """Delete keys older than max_age (default IDEMPOTENCY_TTL_HOURS); returns the count"""
+    cutoff = timezone.now() - (max_age or timedelta(hours=IDEMPOTENCY_TTL_HOURS))
+    deleted, _ = PaymentIdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
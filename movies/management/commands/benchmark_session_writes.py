@@ -0,0 +1,74 @@
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from movies.models import Movie, Theater, Seat, Booking
+
+
+SESSION_ENGINES = [
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.signed_cookies',
+]
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Command(BaseCommand):
+    help = 'Count database writes per booking (seat selection to payment) for each session engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=20, help='Bookings to run per engine')
+        parser.add_argument('--seats', type=int, default=2, help='Seats per booking')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"engine":<16} {"writes/booking":>15} {"session writes":>15} {"session reads":>14}')
+        for engine in SESSION_ENGINES:
+            # Everything, including the synthetic show, is rolled back
+            allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+            with transaction.atomic(), override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=allowed_hosts):
+                writes, session_writes, session_reads = self.run_engine(options['bookings'], options['seats'])
+                transaction.set_rollback(True)
+            label = engine.rsplit('.', 1)[-1]
+            self.stdout.write(f'{label:<16} {writes:>15.1f} {session_writes:>15.1f} {session_reads:>14.1f}')
+
+    def run_engine(self, bookings, seats_per_booking):
+        movie = Movie.objects.create(
+            name='Session Bench', image='movies/bench.jpg', rating=Decimal('7.0'), cast='Bench Cast'
+        )
+        theater = Theater.objects.create(name='Bench Hall', movie=movie, time=timezone.now())
+        seats = Seat.objects.bulk_create([
+            Seat(theater=theater, seat_number=f'S{i}') for i in range(bookings * seats_per_booking)
+        ])
+        user = User.objects.create_user(username=f'session_bench_{timezone.now().timestamp()}')
+        client = Client()
+        client.force_login(user)
+
+        with CaptureQueriesContext(connection) as queries:
+            for i in range(bookings):
+                chosen = seats[i * seats_per_booking:(i + 1) * seats_per_booking]
+                client.post(reverse('book_seats', args=[theater.id]), {'seats': [seat.id for seat in chosen]})
+                client.get(reverse('payment_page'))
+                client.post(
+                    reverse('process_payment'),
+                    json.dumps({'payment_id': f'bench_{i}', 'payment_method': 'razorpay'}),
+                    content_type='application/json',
+                )
+
+        paid = Booking.objects.filter(theater=theater, payment_status='paid').count()
+        if paid != bookings * seats_per_booking:
+            raise CommandError(f'Only {paid} of {bookings * seats_per_booking} seats were paid; the flow failed')
+
+        statements = [query['sql'].lstrip().upper() for query in queries.captured_queries]
+        writes = [sql for sql in statements if sql.startswith(WRITE_PREFIXES)]
+        session_writes = [sql for sql in writes if 'DJANGO_SESSION' in sql]
+        session_reads = [sql for sql in statements if sql.startswith('SELECT') and 'DJANGO_SESSION' in sql]
+        return len(writes) / bookings, len(session_writes) / bookings, len(session_reads) / bookings
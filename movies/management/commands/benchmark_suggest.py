@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from movies.models import Movie
+from movies.suggest import SUGGEST_LIMIT, SuggestIndex, normalize
+
+
+class Command(BaseCommand):
+    help = 'Compare autocomplete lookups in the in-memory trie against icontains queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=2000, help='Number of lookups per method')
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            default=0,
+            help='Benchmark against this many generated movies (inside a rolled back transaction)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['synthetic']:
+                self.generate(options['synthetic'])
+            self.run(options['queries'])
+            transaction.set_rollback(True)
+
+    def run(self, count):
+        movies = list(Movie.objects.only('id', 'name', 'cast', 'rating'))
+        if not movies:
+            self.stdout.write(self.style.WARNING('No movies to index; try --synthetic 5000'))
+            return
+
+        started = time.perf_counter()
+        index = SuggestIndex.build(movies)
+        build_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(f'Indexed {index.size} titles and names from {len(movies)} movies in {build_ms:.1f} ms')
+
+        rng = random.Random(42)
+        words = [word for movie in movies for word in normalize(f'{movie.name} {movie.cast}').split()]
+        prefixes = [word[:rng.randint(1, min(len(word), 5))] for word in rng.choices(words, k=count)]
+
+        def trie(prefix):
+            return index.suggest(prefix)
+
+        def icontains(prefix):
+            return list(
+                Movie.objects.filter(Q(name__icontains=prefix) | Q(cast__icontains=prefix))
+                .order_by('-rating').values_list('id', 'name')[:SUGGEST_LIMIT]
+            )
+
+        for label, lookup in (('trie', trie), ('icontains', icontains)):
+            timings = []
+            for prefix in prefixes:
+                started = time.perf_counter()
+                lookup(prefix)
+                timings.append((time.perf_counter() - started) * 1_000_000)
+            timings.sort()
+            self.stdout.write(self.style.SUCCESS(
+                f'{label:>10}: median {statistics.median(timings):8.1f} us  '
+                f'p99 {timings[int(len(timings) * 0.99) - 1]:8.1f} us  max {timings[-1]:8.1f} us'
+            ))
+
+    def generate(self, total):
+        rng = random.Random(7)
+        syllables = ['ka', 'ra', 'shi', 'ma', 'dha', 'la', 'vee', 'ran', 'jo', 'pa', 'thi', 'nu']
+
+        def word():
+            return ''.join(rng.choices(syllables, k=rng.randint(2, 4))).title()
+
+        Movie.objects.bulk_create([
+            Movie(
+                name=' '.join(word() for _ in range(rng.randint(1, 3))),
+                image='movies/bench.jpg',
+                rating=Decimal(rng.randint(10, 99)) / 10,
+                cast=', '.join(f'{word()} {word()}' for _ in range(rng.randint(2, 5))),
+            )
+            for _ in range(total)
+        ], batch_size=1000)
@@ -1,15 +1,59 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
 from django.utils import timezone
+from movies.idempotency import purge_idempotency_keys
 from movies.models import Booking
 
 
 class Command(BaseCommand):
-    help = 'Release expired seat reservations and delete pending bookings older than 5 minutes'
+    help = 'Release expired seat reservations, delete pending bookings older than 5 minutes and purge old payment idempotency keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--daemon',
+            action='store_true',
+            help='Keep running and reap expired holds every --interval seconds until SIGTERM/SIGINT',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=15.0,
+            help='Seconds to sleep between cycles in daemon mode (default: 15)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Maximum bookings released per batch in daemon mode (default: 500)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=20,
+            help='Maximum batches per cycle before sleeping again (default: 20)',
+        )
+        parser.add_argument(
+            '--clear-sessions',
+            action='store_true',
+            help='Also delete expired rows from django_session (db/cached_db session engines only)',
+        )
 
     def handle(self, *args, **options):
         """Clean up expired reservations and bookings"""
+        self.clear_sessions = options['clear_sessions']
+        if options['daemon']:
+            return self.run_daemon(options['interval'], options['batch_size'], options['max_batches'])
+
         count = Booking.release_expired_bookings()
-        
+        purge_idempotency_keys()
+        self.clear_expired_sessions()
+
         if count > 0:
             self.stdout.write(
                 self.style.SUCCESS(f'Successfully released {count} expired bookings and reservations')
@@ -18,3 +62,61 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.SUCCESS('No expired bookings found')
             )
+
+    def run_daemon(self, interval, batch_size, max_batches):
+        """Reap expired holds in bounded batches until asked to stop"""
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write(f'Received signal {signum}, finishing current cycle')
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Reservation reaper started (interval={interval}s, batch_size={batch_size})')
+        )
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                self.run_cycle(batch_size, max_batches, stop)
+            except Exception as e:
+                # "database is locked", a dropped connection...: report it and retry next cycle
+                self.stderr.write(f'[{timezone.now().isoformat()}] cycle failed: {e!r}')
+                close_old_connections()
+            stop.wait(interval)
+
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS('Reservation reaper stopped'))
+
+    def run_cycle(self, batch_size, max_batches, stop):
+        """Work through the backlog one batch at a time and report cycle metrics"""
+        reaped = 0
+        batches = 0
+        slowest_ms = 0.0
+        started = time.monotonic()
+
+        while batches < max_batches and not stop.is_set():
+            batch_started = time.monotonic()
+            count = Booking.release_expired_bookings(limit=batch_size)
+            slowest_ms = max(slowest_ms, (time.monotonic() - batch_started) * 1000)
+            batches += 1
+            reaped += count
+            if count < batch_size:
+                break
+
+        purge_idempotency_keys()
+        self.clear_expired_sessions()
+        backlog = Booking.expired_pending().count()
+        self.stdout.write(
+            f'[{timezone.now().isoformat()}] reaped={reaped} batches={batches} '
+            f'max_batch_ms={slowest_ms:.1f} cycle_ms={(time.monotonic() - started) * 1000:.1f} '
+            f'backlog={backlog}'
+        )
+        return reaped
+
+    def clear_expired_sessions(self):
+        """Expired database sessions are never deleted by Django itself"""
+        if self.clear_sessions and settings.SESSION_ENGINE.endswith(('.db', '.cached_db')):
+            call_command('clearsessions')
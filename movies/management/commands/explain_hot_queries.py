@@ -0,0 +1,143 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from movies.booking_utils import free_seat_q, upcoming_shows
+from movies.models import Movie, Theater, Seat, Booking
+
+
+# Indexes added for the hot paths, dropped temporarily by --compare
+HOT_PATH_INDEXES = [
+    'theater_movie_time_idx',
+    'seat_live_hold_idx',
+    'booking_status_booked_idx',
+    'booking_status_paid_idx',
+    'booking_user_recent_idx',
+]
+
+
+class Command(BaseCommand):
+    help = 'Print query plans and timings for the hot seat, booking and dashboard queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed-bookings',
+            type=int,
+            default=0,
+            help='First insert this many synthetic paid/pending bookings (with their seats). Never use on production data.',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Also show the plans with the hot-path indexes dropped (inside a rolled back transaction)',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed_bookings']:
+            self.seed(options['seed_bookings'])
+
+        theater = Theater.objects.order_by('id').first()
+        user = User.objects.order_by('id').first()
+        if theater is None or user is None:
+            raise CommandError('Need at least one theater and one user; try --seed-bookings 100000')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('With indexes'))
+        self.explain_all(theater, user)
+
+        if options['compare']:
+            # SQLite and PostgreSQL both roll back DDL, so the drop is never persisted
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for name in HOT_PATH_INDEXES:
+                        cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+                self.stdout.write(self.style.MIGRATE_HEADING('Without indexes'))
+                self.explain_all(theater, user, tag='unindexed')
+                transaction.set_rollback(True)
+
+    def hot_queries(self, theater, user):
+        now = timezone.now()
+        return [
+            ('seat map / bulk hold', Seat.objects.filter(free_seat_q(now), theater=theater)),
+            ('lapsed hold reaper', Seat.objects.filter(is_booked=False, reserved_until__lt=now)),
+            ('expired pending batch', Booking.expired_pending().order_by('booked_at')[:500]),
+            ('dashboard period revenue', Booking.objects.filter(
+                payment_status='paid', payment_date__gte=now - timedelta(days=30)
+            ).values('payment_status').annotate(total=Sum('amount'))),
+            ('profile history', Booking.objects.filter(user=user).order_by('-booked_at')[:20]),
+            ('theater listing', upcoming_shows(theater.movie_id, now)),
+        ]
+
+    def explain_all(self, theater, user, tag='indexed'):
+        for label, queryset in self.hot_queries(theater, user):
+            started = time.perf_counter()
+            list(queryset)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(self.style.SUCCESS(f'{label} ({elapsed_ms:.2f} ms)'))
+            for line in self.explain(queryset, tag):
+                self.stdout.write(f'    {line}')
+
+    def explain(self, queryset, tag):
+        """
+        EXPLAIN the queryset's SQL. The trailing comment keeps each pass's
+        statement text distinct, so SQLite's prepared statement cache cannot
+        hand back a plan made before the indexes were dropped.
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql} /* {tag} */', params)
+            return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+
+    def seed(self, total):
+        """Bulk insert shows, seats and bookings in chunks"""
+        seats_per_show = 500
+        chunk = 5000
+        now = timezone.now()
+        started = time.perf_counter()
+
+        users = User.objects.bulk_create([
+            User(username=f'bench_user_{int(now.timestamp())}_{i}') for i in range(200)
+        ])
+        movies = Movie.objects.bulk_create([
+            Movie(name=f'Bench Movie {i}', image='movies/bench.jpg', rating=Decimal('7.5'), cast='Bench Cast')
+            for i in range(20)
+        ])
+        shows = -(-total // seats_per_show)
+        theaters = Theater.objects.bulk_create([
+            Theater(name=f'Bench Hall {i % 10}', movie=movies[i % len(movies)], time=now + timedelta(hours=i))
+            for i in range(shows)
+        ])
+
+        created = 0
+        while created < total:
+            with transaction.atomic():
+                batch = min(chunk, total - created)
+                seats = Seat.objects.bulk_create([
+                    Seat(
+                        theater=theaters[(created + i) // seats_per_show],
+                        seat_number=str((created + i) % seats_per_show),
+                        is_booked=(created + i) % 10 != 0,
+                    )
+                    for i in range(batch)
+                ])
+                Booking.objects.bulk_create([
+                    Booking(
+                        user=users[(created + i) % len(users)],
+                        seat=seat,
+                        movie_id=seat.theater.movie_id,
+                        theater=seat.theater,
+                        payment_status='paid' if seat.is_booked else 'pending',
+                        payment_method='razorpay' if seat.is_booked else None,
+                        payment_date=now - timedelta(minutes=created + i) if seat.is_booked else None,
+                    )
+                    for i, seat in enumerate(seats)
+                ])
+                created += batch
+
+        self.stdout.write(
+            f'Seeded {total} bookings in {time.perf_counter() - started:.1f}s'
+        )
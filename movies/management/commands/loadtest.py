@@ -0,0 +1,124 @@
+import asyncio
+import statistics
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive concurrent GET requests at a running server and report throughput and latency, '
+        'e.g. to compare gunicorn (bookmyseat.wsgi) with an ASGI server (bookmyseat.asgi)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Absolute URLs; clients cycle through them')
+        parser.add_argument('--concurrency', type=int, default=50, help='Simultaneous clients (default: 50)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (default: 10)')
+        parser.add_argument(
+            '--slow-clients',
+            type=int,
+            default=0,
+            help='Extra clients on a slow network, running alongside the normal ones (default: 0)',
+        )
+        parser.add_argument(
+            '--slow-send',
+            type=float,
+            default=1.0,
+            help='Seconds a slow client waits between its request line and the rest of its headers (default: 1)',
+        )
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per request timeout in seconds')
+
+    def handle(self, *args, **options):
+        targets = [self.parse_url(url) for url in options['urls']]
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        results, elapsed = asyncio.run(self.run(targets, options))
+
+        self.stdout.write(
+            f'{options["concurrency"]} clients and {options["slow_clients"]} slow clients '
+            f'(slow send {options["slow_send"]:.2f}s) for {elapsed:.1f}s'
+        )
+        for label, (latencies, statuses) in results.items():
+            if label == 'slow' and not options['slow_clients']:
+                continue
+            self.report(label, latencies, statuses, elapsed)
+
+    def report(self, label, latencies, statuses, elapsed):
+        errors = sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 500)
+        status_counts = ', '.join(f'{status}={count}' for status, count in sorted(statuses.items(), key=str))
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f'{label:>6}: no successful responses ({status_counts})'))
+            return
+        latencies.sort()
+        completed = len(latencies)
+
+        def percentile(fraction):
+            return latencies[max(int(completed * fraction) - 1, 0)]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{label:>6}: {completed / elapsed:8.1f} req/s  '
+            f'p50 {statistics.median(latencies):7.1f} ms  p95 {percentile(0.95):7.1f} ms  '
+            f'p99 {percentile(0.99):7.1f} ms  max {latencies[-1]:7.1f} ms  errors {errors}'
+        ))
+        self.stdout.write(f'        status {status_counts}')
+
+    def parse_url(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError(f'Only plain http:// URLs are supported, got {url!r}')
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+        return parts.hostname, parts.port or 80, path
+
+    async def run(self, targets, options):
+        results = {'normal': ([], Counter()), 'slow': ([], Counter())}
+        deadline = time.perf_counter() + options['duration']
+
+        async def client(number, label, slow_send):
+            latencies, statuses = results[label]
+            request_number = number
+            while time.perf_counter() < deadline:
+                host, port, path = targets[request_number % len(targets)]
+                request_number += 1
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(self.fetch(host, port, path, slow_send), options['timeout'])
+                except asyncio.TimeoutError:
+                    statuses['timeout'] += 1
+                    continue
+                except OSError as e:
+                    statuses[type(e).__name__] += 1
+                    await asyncio.sleep(0.05)
+                    continue
+                statuses[status] += 1
+                if status < 500:
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        clients = [client(number, 'normal', 0) for number in range(options['concurrency'])]
+        clients += [client(number, 'slow', options['slow_send']) for number in range(options['slow_clients'])]
+        started = time.perf_counter()
+        await asyncio.gather(*clients)
+        return results, time.perf_counter() - started
+
+    async def fetch(self, host, port, path, slow_send):
+        """One request on a fresh connection; returns the status code once the body is read"""
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(f'GET {path} HTTP/1.1\r\n'.encode())
+            if slow_send:
+                await writer.drain()
+                await asyncio.sleep(slow_send)
+            writer.write(f'Host: {host}:{port}\r\nConnection: close\r\n\r\n'.encode())
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+        finally:
+            writer.close()
+        try:
+            return int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise ConnectionError(f'Bad status line {status_line!r}')
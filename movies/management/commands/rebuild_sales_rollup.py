@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from movies.sales_rollup import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollup used by the admin dashboard from paid bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only rebuild days on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only rebuild the last N days (including today)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+        elif options['days']:
+            since = timezone.localdate() - timedelta(days=options['days'] - 1)
+
+        count = rebuild_daily_sales(since)
+        scope = f'since {since}' if since else 'for all days'
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} daily sales rows {scope}')
+        )
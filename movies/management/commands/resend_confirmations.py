@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from movies.email_utils import paid_confirmations_for_show, send_booking_confirmations
+from movies.models import Theater
+
+
+class Command(BaseCommand):
+    help = 'Resend booking confirmation emails for every paid order of one or more shows (e.g. after a reschedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('theater_ids', nargs='+', type=int, help='Theater (show) ids')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Emails sent per mail connection (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        theaters = list(Theater.objects.filter(id__in=options['theater_ids']).select_related('movie'))
+        if not theaters:
+            raise CommandError('No matching theaters found')
+
+        batch_size = options['batch_size']
+        sent = failed = 0
+        started = time.monotonic()
+        for theater in theaters:
+            confirmations = paid_confirmations_for_show(theater)
+            for start in range(0, len(confirmations), batch_size):
+                for result in send_booking_confirmations(confirmations[start:start + batch_size]):
+                    if result.sent:
+                        sent += 1
+                    else:
+                        failed += 1
+                        self.stderr.write(f'{theater.name}: {result.to or "(no email)"} not sent: {result.error}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Sent {sent} confirmations ({failed} failed) in {elapsed:.1f}s')
+        )
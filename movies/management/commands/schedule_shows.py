@@ -0,0 +1,156 @@
+import csv
+import json
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from movies.models import Movie, SeatLayout, Theater, Seat
+
+
+class Command(BaseCommand):
+    help = 'Create shows and all their seats from a schedule file (JSON or CSV) with chunked bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'schedule',
+            help=(
+                'JSON: [{"hall": "Audi 1", "movie": "Jawan" or id, "layout": "Audi 1", '
+                '"times": ["2026-10-20T10:00", ...]}, ...]. '
+                'CSV: hall,movie,layout,times with times separated by ";"'
+            ),
+        )
+        parser.add_argument(
+            '--repeat-days',
+            type=int,
+            default=1,
+            help='Repeat every show time on this many consecutive days (default: 1)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Shows per transaction (default: 50)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows per INSERT statement for seats (default: 2000)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without writing')
+
+    def handle(self, *args, **options):
+        entries = self.load(options['schedule'])
+        shows = self.expand(entries, options['repeat_days'])
+        shows = self.skip_existing(shows)
+
+        seat_total = sum(len(cells) for _, _, _, (_, cells) in shows)
+        if options['dry_run']:
+            self.stdout.write(f'Would create {len(shows)} shows with {seat_total} seats')
+            return
+
+        started = time.perf_counter()
+        created_seats = 0
+        chunk_size = max(1, options['chunk_size'])
+        for start in range(0, len(shows), chunk_size):
+            chunk = shows[start:start + chunk_size]
+            with transaction.atomic():
+                theaters = Theater.objects.bulk_create([
+                    Theater(name=hall, movie_id=movie_id, time=show_time, layout_id=layout_id)
+                    for hall, movie_id, show_time, (layout_id, _) in chunk
+                ])
+                seats = [
+                    Seat(theater=theater, seat_number=seat_number, price_tier=tier)
+                    for theater, (_, _, _, (_, cells)) in zip(theaters, chunk)
+                    for seat_number, tier in cells
+                ]
+                Seat.objects.bulk_create(seats, batch_size=options['batch_size'])
+            created_seats += len(seats)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(shows)} shows and {created_seats} seats in {elapsed:.2f}s '
+            f'({created_seats / elapsed if elapsed else 0:.0f} seats/s)'
+        ))
+
+    def load(self, path):
+        """Read the schedule into dicts with hall, movie, layout and a list of times"""
+        try:
+            with open(path, newline='', encoding='utf-8') as handle:
+                if path.lower().endswith('.json'):
+                    entries = json.load(handle)
+                else:
+                    entries = [
+                        dict(row, times=[t.strip() for t in (row.get('times') or '').split(';') if t.strip()])
+                        for row in csv.DictReader(handle)
+                    ]
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read schedule {path}: {e}')
+        if isinstance(entries, dict):
+            entries = entries.get('shows', [])
+        for number, entry in enumerate(entries, start=1):
+            missing = [field for field in ('hall', 'movie', 'layout', 'times') if not entry.get(field)]
+            if missing:
+                raise CommandError(f'Entry {number} is missing {", ".join(missing)}')
+        return entries
+
+    def expand(self, entries, repeat_days):
+        """(hall, movie_id, time, (layout_id, [(seat_number, tier)])) for every show"""
+        movies = self.resolve_movies({str(entry['movie']) for entry in entries})
+        layouts = {
+            layout.name: (layout.id, [(cell.seat_number, cell.tier) for cell in layout.cells()])
+            for layout in SeatLayout.objects.filter(name__in={entry['layout'] for entry in entries})
+        }
+
+        shows = []
+        for entry in entries:
+            if entry['layout'] not in layouts:
+                raise CommandError(f'Unknown layout {entry["layout"]!r}')
+            for raw_time in entry['times']:
+                show_time = self.parse_time(raw_time)
+                for day in range(max(1, repeat_days)):
+                    shows.append((
+                        entry['hall'], movies[str(entry['movie'])],
+                        show_time + timedelta(days=day), layouts[entry['layout']],
+                    ))
+        return shows
+
+    def resolve_movies(self, references):
+        """Map movie ids or exact names to ids (one query for each kind)"""
+        ids = {ref for ref in references if ref.isdigit()}
+        names = references - ids
+        found = {}
+        for movie_id in Movie.objects.filter(id__in=ids).values_list('id', flat=True):
+            found[str(movie_id)] = movie_id
+        for movie_id, name in Movie.objects.filter(name__in=names).values_list('id', 'name'):
+            found[name] = movie_id
+        unknown = references - set(found)
+        if unknown:
+            raise CommandError(f'Unknown movie(s): {", ".join(sorted(unknown))}')
+        return found
+
+    def parse_time(self, value):
+        try:
+            show_time = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'Bad show time {value!r}; use ISO format such as 2026-10-20T18:30')
+        if timezone.is_naive(show_time):
+            show_time = timezone.make_aware(show_time)
+        return show_time
+
+    def skip_existing(self, shows):
+        """Drop shows already scheduled (same hall, movie and time) so reruns are safe"""
+        if not shows:
+            return shows
+        times = [show_time for _, _, show_time, _ in shows]
+        existing = set(Theater.objects.filter(
+            time__gte=min(times), time__lte=max(times),
+            movie_id__in={movie_id for _, movie_id, _, _ in shows},
+        ).values_list('name', 'movie_id', 'time'))
+        fresh = [show for show in shows if show[:3] not in existing]
+        skipped = len(shows) - len(fresh)
+        if skipped:
+            self.stdout.write(f'Skipping {skipped} shows that already exist')
+        return fresh
@@ -0,0 +1,83 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from movies.email_utils import EMAIL_MAX_ATTEMPTS, process_email_jobs
+from movies.models import EmailJob
+
+
+class Command(BaseCommand):
+    help = 'Send queued booking confirmation emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--daemon',
+            action='store_true',
+            help='Keep draining the outbox every --interval seconds until SIGTERM/SIGINT',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when the outbox is empty in daemon mode (default: 5)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Emails sent per SMTP connection (default: 50)',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=EMAIL_MAX_ATTEMPTS,
+            help=f'Attempts before a job is marked failed (default: {EMAIL_MAX_ATTEMPTS})',
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if options['daemon']:
+            def request_stop(signum, frame):
+                self.stdout.write(f'Received signal {signum}, finishing current batch')
+                stop.set()
+
+            signal.signal(signal.SIGTERM, request_stop)
+            signal.signal(signal.SIGINT, request_stop)
+            self.stdout.write(self.style.SUCCESS('Email worker started'))
+
+        while not stop.is_set():
+            close_old_connections()
+            if not options['daemon']:
+                self.drain(options['batch_size'], options['max_attempts'], stop)
+                break
+            try:
+                sent = self.drain(options['batch_size'], options['max_attempts'], stop)
+            except Exception as e:
+                # "database is locked", a dropped connection...: report it and retry after the interval
+                self.stderr.write(f'[{timezone.now().isoformat()}] batch failed: {e!r}')
+                close_old_connections()
+                sent = 0
+            if not sent:
+                stop.wait(options['interval'])
+
+        if options['daemon']:
+            self.stdout.write(self.style.SUCCESS('Email worker stopped'))
+
+    def drain(self, batch_size, max_attempts, stop):
+        """Send batches until the outbox has nothing due, reporting each batch"""
+        total = 0
+        while not stop.is_set():
+            started = time.monotonic()
+            sent, retried, failed = process_email_jobs(batch_size, max_attempts)
+            if not (sent or retried or failed):
+                break
+            total += sent
+            backlog = EmailJob.objects.filter(status='pending', next_attempt_at__lte=timezone.now()).count()
+            self.stdout.write(
+                f'[{timezone.now().isoformat()}] sent={sent} retried={retried} failed={failed} '
+                f'batch_ms={(time.monotonic() - started) * 1000:.1f} backlog={backlog}'
+            )
+        return total
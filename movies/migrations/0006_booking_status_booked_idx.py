@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_seat_reserved_by_seat_reserved_until'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['payment_status', 'booked_at'], name='booking_status_booked_idx'),
+        ),
+    ]
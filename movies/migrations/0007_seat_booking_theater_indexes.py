@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def dedupe_seat_numbers(apps, schema_editor):
+    """Resolve duplicate seat numbers within a theater before adding the unique constraint"""
+    Seat = apps.get_model('movies', 'Seat')
+    Booking = apps.get_model('movies', 'Booking')
+    duplicates = (
+        Seat.objects.values('theater_id', 'seat_number')
+        .annotate(n=models.Count('id'))
+        .filter(n__gt=1)
+    )
+    for dup in duplicates:
+        seats = list(
+            Seat.objects.filter(theater_id=dup['theater_id'], seat_number=dup['seat_number']).order_by('id')
+        )
+        booked_ids = set(
+            Booking.objects.filter(seat__in=seats).values_list('seat_id', flat=True)
+        )
+        # Keep the first seat; drop untouched extras and relabel any that carry a booking
+        for seat in seats[1:]:
+            if seat.id in booked_ids or seat.is_booked:
+                seat.seat_number = f'{seat.seat_number}-{seat.id}'[:10]
+                seat.save(update_fields=['seat_number'])
+            else:
+                seat.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_booking_status_booked_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['payment_status', 'payment_date'], name='booking_status_paid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-booked_at'], name='booking_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seat',
+            index=models.Index(condition=models.Q(('is_booked', False), ('reserved_until__isnull', False)), fields=['reserved_until'], name='seat_live_hold_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='theater',
+            index=models.Index(fields=['movie', 'time'], name='theater_movie_time_idx'),
+        ),
+        migrations.RunPython(dedupe_seat_numbers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='seat',
+            constraint=models.UniqueConstraint(fields=('theater', 'seat_number'), name='unique_seat_per_theater'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_movie_fts USING fts5(
+        name, "cast", description,
+        content='movies_movie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_movie_fts_insert AFTER INSERT ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(rowid, name, "cast", description)
+        VALUES (new.id, new.name, new."cast", coalesce(new.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_movie_fts_delete AFTER DELETE ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(movies_movie_fts, rowid, name, "cast", description)
+        VALUES ('delete', old.id, old.name, old."cast", coalesce(old.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_movie_fts_update AFTER UPDATE ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(movies_movie_fts, rowid, name, "cast", description)
+        VALUES ('delete', old.id, old.name, old."cast", coalesce(old.description, ''));
+        INSERT INTO movies_movie_fts(rowid, name, "cast", description)
+        VALUES (new.id, new.name, new."cast", coalesce(new.description, ''));
+    END
+    """,
+    "INSERT INTO movies_movie_fts(movies_movie_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS movies_movie_fts_update",
+    "DROP TRIGGER IF EXISTS movies_movie_fts_delete",
+    "DROP TRIGGER IF EXISTS movies_movie_fts_insert",
+    "DROP TABLE IF EXISTS movies_movie_fts",
+]
+
+# Must match the expression used by movies.search so the planner picks the index
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX IF NOT EXISTS movies_movie_search_idx ON movies_movie USING GIN (
+        (setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+         setweight(to_tsvector('simple', coalesce("cast", '')), 'B') ||
+         setweight(to_tsvector('simple', coalesce(description, '')), 'C'))
+    )
+    """,
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS movies_movie_search_idx",
+]
+
+
+def run_for_vendor(forward):
+    """Run the statements for the current database; other backends fall back to LIKE search"""
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        statements = {
+            'sqlite': SQLITE_FORWARD if forward else SQLITE_REVERSE,
+            'postgresql': POSTGRES_FORWARD if forward else POSTGRES_REVERSE,
+        }.get(vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_emailjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_for_vendor(True), run_for_vendor(False)),
+    ]
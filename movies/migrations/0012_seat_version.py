@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_paymentidempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seat',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_sales(apps, schema_editor):
+    """Fill the rollup from existing paid bookings (same grouping as rebuild_daily_sales)"""
+    Booking = apps.get_model('movies', 'Booking')
+    DailySalesRollup = apps.get_model('movies', 'DailySalesRollup')
+
+    rows = Booking.objects.filter(payment_status='paid', payment_date__isnull=False).annotate(
+        day=TruncDate('payment_date')
+    ).values('day', 'movie_id', 'theater_id', 'payment_method').annotate(
+        orders=Count('payment_id', distinct=True),
+        seat_count=Count('id'),
+        total=Sum('amount'),
+    ).order_by()
+
+    buckets = {}
+    for row in rows:
+        key = (row['day'], row['movie_id'], row['theater_id'], row['payment_method'] or '')
+        bucket = buckets.setdefault(key, DailySalesRollup(
+            day=key[0], movie_id=key[1], theater_id=key[2], payment_method=key[3],
+            bookings=0, seats=0, revenue=0,
+        ))
+        bucket.bookings += row['orders'] or 1
+        bucket.seats += row['seat_count']
+        bucket.revenue += row['total'] or 0
+
+    DailySalesRollup.objects.all().delete()
+    DailySalesRollup.objects.bulk_create(buckets.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_seatlayout'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User 
+from django.utils import timezone
 
 
 class Movie(models.Model):
@@ -56,26 +57,129 @@ class Movie(models.Model):
         else:
             return None
 
+class SeatLayout(models.Model):
+    """An auditorium's seat grid (see movies.seat_layout for the encoding) with its price tiers"""
+    name = models.CharField(max_length=255, unique=True)
+    grid = models.TextField(help_text="Rows separated by '/', run-length cells: '.' = aisle/gap, a-z = seat of that tier. e.g. 2.8s2./12p")
+    # tier letter -> {"name": "Premium", "price": "350.00"}
+    tiers = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.name
+    
+    def clean(self):
+        from decimal import Decimal, InvalidOperation
+        from django.core.exceptions import ValidationError
+        from .seat_layout import LayoutError, decode_grid
+        
+        try:
+            rows = decode_grid(self.grid)
+        except LayoutError as e:
+            raise ValidationError({'grid': str(e)})
+        if not isinstance(self.tiers or {}, dict):
+            raise ValidationError({'tiers': 'Tiers must map each tier letter to {"name": ..., "price": ...}'})
+        # tier_prices() turns every price into a Decimal, so a bad one must not get saved
+        bad_prices = []
+        for tier, info in sorted((self.tiers or {}).items()):
+            price = info.get('price') if isinstance(info, dict) else None
+            if price is None:
+                continue
+            try:
+                amount = Decimal(str(price))
+            except InvalidOperation:
+                amount = None
+            if amount is None or not amount.is_finite() or amount < 0:
+                bad_prices.append(f'{tier} ({price!r})')
+        if bad_prices:
+            raise ValidationError({'tiers': f'Invalid price for tier: {", ".join(bad_prices)}'})
+        unknown = {cell for row in rows for cell in row if cell != '.'} - set(self.tiers or {})
+        if self.tiers and unknown:
+            raise ValidationError({'tiers': f'No tier defined for: {", ".join(sorted(unknown))}'})
+    
+    def cells(self):
+        """LayoutCell for every seat, row by row"""
+        from .seat_layout import iter_cells
+        return list(iter_cells(self.grid))
+    
+    @property
+    def seat_count(self):
+        return sum(1 for _ in self.cells())
+    
+    def tier_prices(self):
+        """Tier letter -> Decimal price for tiers that define one"""
+        from decimal import Decimal
+        return {
+            tier: Decimal(str(info['price']))
+            for tier, info in (self.tiers or {}).items()
+            if isinstance(info, dict) and info.get('price') is not None
+        }
+    
+    def build_seats(self, theater):
+        """Unsaved Seat objects for every cell of the grid"""
+        return [
+            Seat(theater=theater, seat_number=cell.seat_number, price_tier=cell.tier)
+            for cell in self.cells()
+        ]
+    
+    def generate_seats(self, theater, batch_size=1000):
+        """Create a show's seats from the grid with one bulk INSERT per batch"""
+        return Seat.objects.bulk_create(self.build_seats(theater), batch_size=batch_size)
+    
+    def as_dict(self):
+        """Small payload for the browser: the encoded grid plus tier names and prices"""
+        return {'name': self.name, 'grid': self.grid, 'tiers': self.tiers}
+
+
 class Theater(models.Model):
     name = models.CharField(max_length=255)
     movie = models.ForeignKey(Movie,on_delete=models.CASCADE,related_name='theaters')
     time= models.DateTimeField()
+    layout = models.ForeignKey(SeatLayout, on_delete=models.SET_NULL, null=True, blank=True, related_name='theaters')
 
     def __str__(self):
         return f'{self.name} - {self.movie.name} at {self.time}'
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['movie', 'time'], name='theater_movie_time_idx'),
+        ]
 
 class Seat(models.Model):
     theater = models.ForeignKey(Theater,on_delete=models.CASCADE,related_name='seats')
     seat_number = models.CharField(max_length=10)
     is_booked=models.BooleanField(default=False)
+    price_tier = models.CharField(max_length=1, blank=True, default='')  # SeatLayout tier letter
     
     # Temporary reservation fields
     reserved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reserved_seats')
     reserved_until = models.DateTimeField(null=True, blank=True)
+    
+    # Bumped by every write; single-row updates compare-and-swap on it
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f'{self.seat_number} in {self.theater.name}'
     
+    def compare_and_swap(self, **changes):
+        """
+        Apply changes only if the row still has the version this instance was
+        loaded with: UPDATE ... WHERE id=? AND version=?. Returns False on a
+        conflict (the row was changed by someone else) without writing.
+        """
+        from .seat_map import invalidate_seat_maps
+        
+        updated = Seat.objects.filter(pk=self.pk, version=self.version).update(
+            version=models.F('version') + 1, **changes
+        )
+        if not updated:
+            return False
+        for field, value in changes.items():
+            setattr(self, field, value)
+        self.version += 1
+        invalidate_seat_maps([self.theater_id])
+        return True
+    
     def is_available(self):
         """Check if seat is available (not booked and not temporarily reserved)"""
         from django.utils import timezone
@@ -84,34 +188,28 @@ class Seat(models.Model):
         if self.is_booked:
             return False
         
-        # If reserved and reservation hasn't expired, not available
+        # If reserved and reservation hasn't expired, not available.
+        # An expired reservation simply counts as free; the reaper clears it later.
         if self.reserved_until and self.reserved_until > timezone.now():
             return False
         
-        # If reservation expired, clear it and mark as available
-        if self.reserved_until and self.reserved_until <= timezone.now():
-            self.release_reservation()
-            return True
-        
         return True
     
     def reserve(self, user, minutes=5):
-        """Temporarily reserve seat for a user"""
+        """Temporarily reserve seat for a user; False if unavailable or changed concurrently"""
         from django.utils import timezone
         from datetime import timedelta
         
-        if self.is_available():
-            self.reserved_by = user
-            self.reserved_until = timezone.now() + timedelta(minutes=minutes)
-            self.save()
-            return True
-        return False
+        if not self.is_available():
+            return False
+        return self.compare_and_swap(
+            reserved_by=user,
+            reserved_until=timezone.now() + timedelta(minutes=minutes),
+        )
     
     def release_reservation(self):
-        """Release temporary reservation"""
-        self.reserved_by = None
-        self.reserved_until = None
-        self.save()
+        """Release temporary reservation; False if the seat changed since it was loaded"""
+        return self.compare_and_swap(reserved_by=None, reserved_until=None)
     
     def is_reserved_by(self, user):
         """Check if seat is reserved by specific user"""
@@ -119,6 +217,22 @@ class Seat(models.Model):
         return (self.reserved_by == user and 
                 self.reserved_until and 
                 self.reserved_until > timezone.now())
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['theater', 'seat_number'], name='unique_seat_per_theater'),
+        ]
+        # Seat map and bulk hold lookups by theater use the theater foreign
+        # key's own index (movies_seat_theater_id_*), so no extra per-show
+        # index is needed
+        indexes = [
+            # Reaper: only unbooked seats carrying a hold are ever scanned for lapsed holds
+            models.Index(
+                fields=['reserved_until'],
+                name='seat_live_hold_idx',
+                condition=models.Q(is_booked=False, reserved_until__isnull=False),
+            ),
+        ]
 
 class Booking(models.Model):
     PAYMENT_STATUS_CHOICES = [
@@ -156,27 +270,150 @@ class Booking(models.Model):
         return False
     
     @classmethod
-    def release_expired_bookings(cls):
-        """Release all expired pending bookings and their seat reservations"""
+    def expired_pending(cls):
+        """Pending bookings older than the 5 minute payment window"""
         from django.utils import timezone
         from datetime import timedelta
         
         expiry_threshold = timezone.now() - timedelta(minutes=5)
-        expired_bookings = cls.objects.filter(
+        return cls.objects.filter(
             payment_status='pending',
             booked_at__lt=expiry_threshold
         )
+    
+    @classmethod
+    def release_expired_bookings(cls, limit=None):
+        """
+        Release expired pending bookings and their seat reservations.
+        
+        Set-based: one UPDATE clears the lapsed seat holds and one DELETE
+        removes the expired pending bookings. With ``limit`` only the oldest
+        ``limit`` bookings are handled, walking the (payment_status, booked_at)
+        index, so a large backlog can be worked off in bounded batches.
+        """
+        from django.db import transaction
+        from django.utils import timezone
+        from .seat_map import invalidate_seat_maps
+        
+        now = timezone.now()
         
-        count = 0
-        for booking in expired_bookings:
-            # Release seat reservation
-            if booking.seat.reserved_by == booking.user:
-                booking.seat.release_reservation()
-            # Delete expired booking
-            booking.delete()
-            count += 1
+        with transaction.atomic():
+            if limit is None:
+                lapsed = Seat.objects.filter(
+                    is_booked=False,
+                    reserved_until__lt=now
+                )
+                invalidate_seat_maps(lapsed.values_list('theater_id', flat=True).distinct())
+                lapsed.update(reserved_by=None, reserved_until=None, version=models.F('version') + 1)
+                _, deleted = cls.expired_pending().delete()
+                return deleted.get(cls._meta.label, 0)
+            
+            # Rows locked by a confirming payment are left for the next batch
+            batch = list(
+                cls.expired_pending().select_for_update(skip_locked=True)
+                .order_by('booked_at').values_list('id', 'seat_id', 'theater_id')[:limit]
+            )
+            if not batch:
+                return 0
+            booking_ids = [booking_id for booking_id, _, _ in batch]
+            seat_ids = [seat_id for _, seat_id, _ in batch]
+            
+            Seat.objects.filter(
+                id__in=seat_ids,
+                is_booked=False,
+                reserved_until__lt=now
+            ).update(reserved_by=None, reserved_until=None, version=models.F('version') + 1)
+            invalidate_seat_maps(theater_id for _, _, theater_id in batch)
+            # Re-check the expiry: a payment may have confirmed since the SELECT
+            _, deleted = cls.expired_pending().filter(id__in=booking_ids).delete()
         
-        return count
+        return deleted.get(cls._meta.label, 0)
+    
+    class Meta:
+        ordering = ['-booked_at']
+        indexes = [
+            models.Index(fields=['payment_status', 'booked_at'], name='booking_status_booked_idx'),
+            # Dashboard revenue over a payment_date window
+            models.Index(fields=['payment_status', 'payment_date'], name='booking_status_paid_idx'),
+            # Profile booking history, newest first
+            models.Index(fields=['user', '-booked_at'], name='booking_user_recent_idx'),
+        ]
+
+
+class DailySalesRollup(models.Model):
+    """Paid sales per day, movie, theater and payment method, kept for the dashboard"""
+    day = models.DateField()
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='daily_sales')
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='daily_sales')
+    payment_method = models.CharField(max_length=50, blank=True, default='')
+    bookings = models.PositiveIntegerField(default=0)  # confirmed orders
+    seats = models.PositiveIntegerField(default=0)  # paid Booking rows (one per seat)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f'{self.day} {self.movie_id}/{self.theater_id}/{self.payment_method or "-"}: {self.revenue}'
+    
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'movie', 'theater', 'payment_method'],
+                name='unique_daily_sales_bucket',
+            ),
+        ]
+
+
+class EmailJob(models.Model):
+    """Outbox row for a booking confirmation email, drained by the send_queued_emails worker"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='email_jobs')
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='email_jobs')
+    booking_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f'Confirmation for {self.user_id} ({len(self.booking_ids)} seats) - {self.status}'
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emailjob_due_idx'),
+        ]
+
+
+class PaymentIdempotencyKey(models.Model):
+    """Stored outcome of a payment confirmation request, so retries replay it instead of re-running"""
+    STATUS_CHOICES = [
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payment_idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # sha256 of the request parameters
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='processing')
+    response = models.JSONField(blank=True, null=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f'{self.user_id}:{self.key} - {self.status}'
     
     class Meta:
-        ordering = ['-booked_at']
\ No newline at end of file
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_payment_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='payment_idem_created_idx'),
+        ]
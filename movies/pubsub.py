@@ -0,0 +1,110 @@
+"""
+Minimal publish/subscribe for live seat map updates.
+
+Publishers are ordinary sync code (transaction.on_commit callbacks in request
+threads or management commands); subscribers are async SSE responses. The
+broker class is read from settings.SEAT_EVENTS_BROKER, so a deployment that
+runs several processes can plug in a Redis/Postgres LISTEN backend exposing
+the same publish()/subscribe() interface.
+
+InProcessBroker, the default, only reaches subscribers in the same process:
+enough for a single ASGI worker, or for tests.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+DEFAULT_BROKER = 'movies.pubsub.InProcessBroker'
+
+# Messages only say "something changed", so a slow subscriber can safely drop extras
+SUBSCRIPTION_QUEUE_SIZE = 16
+
+
+class Subscription:
+    """Async receiver for one topic; use as an async context manager"""
+    def __init__(self, broker, topic):
+        self.broker = broker
+        self.topic = topic
+        self.loop = None
+        self.queue = None
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(SUBSCRIPTION_QUEUE_SIZE)
+        self.broker._add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker._remove(self)
+
+    def deliver(self, message):
+        """Thread-safe hand-off into the subscriber's event loop"""
+        def put():
+            try:
+                self.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                pass
+        try:
+            self.loop.call_soon_threadsafe(put)
+        except RuntimeError:
+            # Loop already closed; the subscription is going away
+            pass
+
+    async def get(self, timeout=None):
+        """Next message, or None if nothing arrives within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Fan messages out to subscribers living in this process"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, topic):
+        return Subscription(self, topic)
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+        return len(subscribers)
+
+    def subscriber_count(self, topic):
+        with self._lock:
+            return len(self._subscribers.get(topic, ()))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.topic].add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured by SEAT_EVENTS_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'SEAT_EVENTS_BROKER', DEFAULT_BROKER))()
+    return _broker
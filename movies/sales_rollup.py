@@ -0,0 +1,142 @@
+"""
+Maintenance of the DailySalesRollup table.
+
+record_sales() is called inside the payment confirmation transaction and
+adds the confirmed order to its (day, movie, theater, payment_method) bucket.
+remove_sales() takes bookings back out when the admin refunds or deletes
+them. rebuild_daily_sales() recomputes buckets from paid bookings, for
+backfills and after other manual edits (e.g. changing a paid amount).
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .models import Booking, DailySalesRollup
+
+
+def _add_to_bucket(day, movie_id, theater_id, payment_method, orders, seats, revenue):
+    """Increment one rollup row, creating it if this is the bucket's first sale"""
+    bucket = DailySalesRollup.objects.filter(
+        day=day, movie_id=movie_id, theater_id=theater_id, payment_method=payment_method
+    )
+    increments = {
+        'bookings': F('bookings') + orders,
+        'seats': F('seats') + seats,
+        'revenue': F('revenue') + revenue,
+    }
+    if bucket.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DailySalesRollup.objects.create(
+                day=day, movie_id=movie_id, theater_id=theater_id, payment_method=payment_method,
+                bookings=orders, seats=seats, revenue=revenue,
+            )
+    except IntegrityError:
+        # Another confirmation created the bucket first
+        bucket.update(**increments)
+
+
+def record_sales(bookings, payment_method, payment_date):
+    """
+    Add one confirmed order to the rollup.
+
+    Args:
+        bookings: Booking objects just marked paid (one per seat)
+        payment_method: razorpay, stripe, etc.
+        payment_date: When the payment was confirmed
+    """
+    day = timezone.localdate(payment_date)
+    buckets = defaultdict(lambda: [0, Decimal('0')])
+    for booking in bookings:
+        bucket = buckets[(booking.movie_id, booking.theater_id)]
+        bucket[0] += 1
+        bucket[1] += Decimal(str(booking.amount))
+
+    for (movie_id, theater_id), (seats, revenue) in buckets.items():
+        _add_to_bucket(day, movie_id, theater_id, payment_method or '', 1, seats, revenue)
+
+
+def remove_sales(bookings):
+    """
+    Subtract bookings that are no longer paid (refunded, failed or deleted).
+
+    Args:
+        bookings: Booking objects as they were while paid; call after the
+            change is saved so the order count only drops once the last
+            paid seat of a payment is gone
+    """
+    buckets = defaultdict(lambda: [set(), 0, Decimal('0')])
+    for booking in bookings:
+        if booking.payment_date is None:
+            continue
+        key = (
+            timezone.localdate(booking.payment_date), booking.movie_id,
+            booking.theater_id, booking.payment_method or '',
+        )
+        bucket = buckets[key]
+        bucket[0].add(booking.payment_id or None)
+        bucket[1] += 1
+        bucket[2] += Decimal(str(booking.amount))
+
+    for (day, movie_id, theater_id, payment_method), (payment_ids, seats, revenue) in buckets.items():
+        still_paid = set(Booking.objects.filter(
+            payment_status='paid', movie_id=movie_id, theater_id=theater_id,
+            payment_id__in=[payment_id for payment_id in payment_ids if payment_id],
+        ).values_list('payment_id', flat=True))
+        orders = len(payment_ids - still_paid)
+        DailySalesRollup.objects.filter(
+            day=day, movie_id=movie_id, theater_id=theater_id, payment_method=payment_method
+        ).update(
+            bookings=Greatest(F('bookings') - orders, 0),
+            seats=Greatest(F('seats') - seats, 0),
+            revenue=Greatest(F('revenue') - revenue, Decimal('0')),
+        )
+
+
+def rebuild_daily_sales(since=None):
+    """
+    Recompute rollup rows from paid bookings.
+
+    Args:
+        since: Only rebuild days on or after this date (default: everything)
+
+    Returns:
+        Number of rollup rows written
+    """
+    paid = Booking.objects.filter(payment_status='paid', payment_date__isnull=False)
+    rollups = DailySalesRollup.objects.all()
+    if since is not None:
+        paid = paid.filter(payment_date__date__gte=since)
+        rollups = rollups.filter(day__gte=since)
+
+    rows = paid.annotate(day=TruncDate('payment_date')).values(
+        'day', 'movie_id', 'theater_id', 'payment_method'
+    ).annotate(
+        orders=Count('payment_id', distinct=True),
+        seat_count=Count('id'),
+        total=Sum('amount'),
+    ).order_by()
+
+    buckets = {}
+    for row in rows:
+        # NULL and '' payment methods share one bucket
+        key = (row['day'], row['movie_id'], row['theater_id'], row['payment_method'] or '')
+        bucket = buckets.setdefault(key, DailySalesRollup(
+            day=key[0], movie_id=key[1], theater_id=key[2], payment_method=key[3],
+            bookings=0, seats=0, revenue=0,
+        ))
+        # Paid bookings without a gateway reference still count as one order
+        bucket.bookings += row['orders'] or 1
+        bucket.seats += row['seat_count']
+        bucket.revenue += row['total'] or 0
+
+    with transaction.atomic():
+        rollups.delete()
+        DailySalesRollup.objects.bulk_create(buckets.values(), batch_size=1000)
+    return len(buckets)
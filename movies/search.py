@@ -0,0 +1,127 @@
+"""
+Full-text movie search over name, cast and description.
+
+SQLite uses the movies_movie_fts FTS5 table (migration 0010), kept in sync
+with movies_movie by triggers so every save/delete, including bulk updates
+and raw SQL, updates the index. Results are ranked with bm25, weighting the
+name above the cast and the cast above the description.
+
+PostgreSQL uses a weighted tsvector expression backed by a GIN index and
+ranks with ts_rank. Other backends fall back to an icontains scan.
+
+Every term is matched as a prefix, so "shah ruk" finds "Shah Rukh Khan". When
+a query matches nothing, each term is corrected against the words of the
+catalog's names and cast (difflib) and the search is retried once.
+"""
+
+import difflib
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Movie
+
+
+SEARCH_LIMIT = 50
+
+# bm25 column weights for name, cast, description
+FTS_WEIGHTS = (10.0, 3.0, 1.0)
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+# Must match the indexed expression in migration 0010
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(\"cast\", '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def search_terms(query):
+    """Lower-cased word tokens of a user query"""
+    return [term.casefold() for term in TERM_RE.findall(query or '')]
+
+
+def _sqlite_search(terms, limit):
+    match = ' '.join(f'"{term}"*' for term in terms)
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM movies_movie_fts WHERE movies_movie_fts MATCH %s '
+            f'ORDER BY bm25(movies_movie_fts, {weights}) LIMIT %s',
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _postgres_search(terms, limit):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM movies_movie WHERE ({PG_DOCUMENT}) @@ to_tsquery(\'simple\', %s) '
+            f'ORDER BY ts_rank({PG_DOCUMENT}, to_tsquery(\'simple\', %s)) DESC, id LIMIT %s',
+            [tsquery, tsquery, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(terms, limit):
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(cast__icontains=term) | Q(description__icontains=term)
+    return list(Movie.objects.filter(condition).order_by('-rating', 'id').values_list('id', flat=True)[:limit])
+
+
+def _run(terms, limit):
+    if connection.vendor == 'sqlite':
+        return _sqlite_search(terms, limit)
+    if connection.vendor == 'postgresql':
+        return _postgres_search(terms, limit)
+    return _fallback_search(terms, limit)
+
+
+def correct_terms(terms, vocabulary):
+    """Replace each term with its closest vocabulary word, if any is close enough"""
+    corrected = []
+    for term in terms:
+        if any(word.startswith(term) for word in vocabulary):
+            corrected.append(term)
+            continue
+        matches = difflib.get_close_matches(term, vocabulary, n=1, cutoff=0.75)
+        corrected.append(matches[0] if matches else term)
+    return corrected
+
+
+def search_vocabulary(movies):
+    """Distinct lower-cased words from movie names and cast"""
+    words = set()
+    for movie in movies:
+        words.update(search_terms(movie.name))
+        words.update(search_terms(movie.cast))
+    return sorted(words)
+
+
+def search_movie_ids(query, limit=SEARCH_LIMIT, vocabulary=None):
+    """
+    Ids of the movies matching a search query, best match first.
+
+    Args:
+        query: Free text from the search box
+        limit: Maximum number of ids returned
+        vocabulary: Known words for typo correction (default: none, no retry)
+
+    Returns:
+        List of movie ids
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    ids = _run(terms, limit)
+    if ids or not vocabulary:
+        return ids
+
+    corrected = correct_terms(terms, vocabulary)
+    if corrected == terms:
+        return ids
+    return _run(corrected, limit)
@@ -0,0 +1,94 @@
+"""
+Compact encoding of an auditorium's seat grid.
+
+A grid is one string: rows separated by '/', each row a run-length encoded
+sequence of cells. A cell is '.' for no seat (aisle or gap) or a lower-case
+tier letter for a seat of that price tier/section:
+
+    '2.8s2./2.8s2./12p'
+
+is two 8-seat standard rows flanked by aisles and a 12-seat premium back row.
+The tier letters map to names and prices in SeatLayout.tiers. Seats are
+labelled by row letter and their position among the row's seats (A1, A2...),
+so aisles do not consume numbers.
+"""
+
+import re
+from collections import namedtuple
+
+
+GAP = '.'
+
+LayoutCell = namedtuple('LayoutCell', ['row', 'column', 'row_label', 'seat_number', 'tier'])
+
+_RUN_RE = re.compile(r'(\d*)([a-z.])')
+
+
+class LayoutError(ValueError):
+    """The grid string cannot be decoded"""
+
+
+def row_label(index):
+    """A, B, ... Z, AA, AB, ... for 0-based row indexes"""
+    label = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(ord('A') + remainder) + label
+    return label
+
+
+def encode_row(cells):
+    """Run-length encode one row given as a sequence of cell characters"""
+    runs = []
+    previous = None
+    count = 0
+    for cell in cells:
+        if cell == previous:
+            count += 1
+            continue
+        if previous is not None:
+            runs.append(f'{count if count > 1 else ""}{previous}')
+        previous, count = cell, 1
+    if previous is not None:
+        runs.append(f'{count if count > 1 else ""}{previous}')
+    return ''.join(runs)
+
+
+def encode_grid(rows):
+    """Encode rows (strings or lists of cell characters) into a grid string"""
+    return '/'.join(encode_row(row) for row in rows)
+
+
+def decode_grid(grid):
+    """Expand a grid string into a list of row strings, one character per cell"""
+    rows = []
+    for encoded in (grid or '').strip().split('/'):
+        position = 0
+        cells = []
+        for match in _RUN_RE.finditer(encoded):
+            if match.start() != position:
+                raise LayoutError(f'Bad cell {encoded[position:match.start()]!r} in row {len(rows) + 1}')
+            cells.append(match.group(2) * int(match.group(1) or 1))
+            position = match.end()
+        if position != len(encoded):
+            raise LayoutError(f'Bad cell {encoded[position:]!r} in row {len(rows) + 1}')
+        rows.append(''.join(cells))
+    return rows
+
+
+def iter_cells(grid):
+    """Yield a LayoutCell for every seat in the grid, row by row"""
+    for row_index, row in enumerate(decode_grid(grid)):
+        label = row_label(row_index)
+        number = 0
+        for column, cell in enumerate(row):
+            if cell == GAP:
+                continue
+            number += 1
+            yield LayoutCell(row_index, column, label, f'{label}{number}', cell)
+
+
+def uniform_grid(rows, seats_per_row, tier='s'):
+    """Grid of identical rows with no aisles"""
+    return encode_grid([tier * seats_per_row] * rows)
@@ -0,0 +1,231 @@
+"""
+Compact seat availability for a single show.
+
+A SeatMap is built from one values_list query and keeps booked seats as an
+integer bitset plus the expiry of each live hold, so a seat map page or the
+JSON endpoint never instantiates Seat models.
+
+Snapshots are cached under a per-theater version token. Every write path
+replaces that token with a fresh one once its transaction commits, so
+readers never see a half-applied change and a writer only ever touches one
+cache key. Tokens are random rather than counted: FileBasedCache.incr is a
+get + set, so two workers committing together could both write N+1 and a
+snapshot built between their commits would outlive the second. Holds that
+lapse need no invalidation: the snapshot keeps their expiry and state() is
+evaluated at read time. Each bump is also published on the show's pub/sub
+topic, which drives the live seat event stream. The a-prefixed helpers read
+the same keys through the async cache and ORM APIs for ASGI views.
+"""
+
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Seat
+from .pubsub import get_broker
+
+
+FREE = '0'
+HELD = '1'
+BOOKED = '2'
+
+# Snapshot lifetime when the cache is per process (LocMemCache)
+LOCAL_SEAT_MAP_CACHE_TIMEOUT = 5
+
+# Lightweight stand-in for Seat in templates: same attribute names, no queries
+SeatCell = namedtuple('SeatCell', ['id', 'seat_number', 'is_booked', 'is_available', 'is_held'])
+
+
+class SeatMap:
+    """Booked bitset and hold expiries for every seat of one theater show"""
+    def __init__(self, theater_id, seat_ids, labels, booked_bits=0, holds=None):
+        self.theater_id = theater_id
+        self.seat_ids = seat_ids
+        self.labels = labels
+        self.booked_bits = booked_bits
+        # seat index -> reserved_until timestamp of a hold that was live at build time
+        self.holds = holds or {}
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    def held_bits(self, now=None):
+        """Bitset of seats whose hold has not lapsed yet"""
+        now_ts = (now or timezone.now()).timestamp()
+        bits = 0
+        for index, until_ts in self.holds.items():
+            if until_ts > now_ts:
+                bits |= 1 << index
+        return bits & ~self.booked_bits
+
+    def state(self, now=None):
+        """One character per seat: '0' free, '1' held, '2' booked"""
+        held = self.held_bits(now)
+        booked = self.booked_bits
+        return ''.join(
+            BOOKED if booked >> i & 1 else HELD if held >> i & 1 else FREE
+            for i in range(len(self.seat_ids))
+        )
+
+    def counts(self, now=None):
+        """Number of free, held and booked seats"""
+        booked = bin(self.booked_bits).count('1')
+        held = bin(self.held_bits(now)).count('1')
+        return {'available': len(self.seat_ids) - booked - held, 'held': held, 'booked': booked}
+
+    def cells(self, now=None):
+        """SeatCell tuples for the seat selection template"""
+        state = self.state(now)
+        return [
+            SeatCell(seat_id, label, code == BOOKED, code == FREE, code == HELD)
+            for seat_id, label, code in zip(self.seat_ids, self.labels, state)
+        ]
+
+    def changes(self, previous_state, now=None):
+        """{seat_id: state code} for seats whose state differs from previous_state"""
+        state = self.state(now)
+        return {
+            seat_id: code
+            for seat_id, code, old in zip(self.seat_ids, state, previous_state)
+            if code != old
+        }
+
+    def as_dict(self, now=None):
+        """JSON payload: parallel id/label lists plus the state string"""
+        return {
+            'theater': self.theater_id,
+            'ids': self.seat_ids,
+            'labels': self.labels,
+            'state': self.state(now),
+        }
+
+    @classmethod
+    def from_rows(cls, theater_id, rows, now=None):
+        """Build from (id, seat_number, is_booked, reserved_until) rows"""
+        now = now or timezone.now()
+        seat_ids = []
+        labels = []
+        booked_bits = 0
+        holds = {}
+        for index, (seat_id, seat_number, is_booked, reserved_until) in enumerate(rows):
+            seat_ids.append(seat_id)
+            labels.append(seat_number)
+            if is_booked:
+                booked_bits |= 1 << index
+            elif reserved_until and reserved_until > now:
+                holds[index] = reserved_until.timestamp()
+        return cls(theater_id, seat_ids, labels, booked_bits, holds)
+
+
+def build_seat_map(theater_id):
+    """Load a show's seat map with a single query"""
+    rows = Seat.objects.filter(theater_id=theater_id).order_by('id').values_list(
+        'id', 'seat_number', 'is_booked', 'reserved_until'
+    )
+    return SeatMap.from_rows(theater_id, rows)
+
+
+async def abuild_seat_map(theater_id):
+    """Async build_seat_map: the same single query through the async ORM"""
+    rows = Seat.objects.filter(theater_id=theater_id).order_by('id').values_list(
+        'id', 'seat_number', 'is_booked', 'reserved_until'
+    )
+    return SeatMap.from_rows(theater_id, [row async for row in rows])
+
+
+def _version_key(theater_id):
+    return f'seatmap:version:{theater_id}'
+
+
+def _snapshot_key(theater_id, version):
+    return f'seatmap:{theater_id}:{version}'
+
+
+def _snapshot_timeout():
+    """
+    How long a snapshot is kept. A process-local cache never sees other
+    workers' version bumps, so its snapshots must expire within seconds.
+    """
+    timeout = getattr(settings, 'SEAT_MAP_CACHE_TIMEOUT', 300)
+    if isinstance(caches['default'], LocMemCache):
+        return min(timeout, LOCAL_SEAT_MAP_CACHE_TIMEOUT)
+    return timeout
+
+
+def get_seat_map_version(theater_id):
+    """Current version of a show's seat map, creating it if needed"""
+    key = _version_key(theater_id)
+    version = cache.get(key)
+    if version is None:
+        # A random seed, so a version lost to eviction is never reused
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_seat_map_version(theater_id):
+    """Async get_seat_map_version"""
+    key = _version_key(theater_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def get_seat_map_versions(theater_ids):
+    """Current seat map version of several shows with one cache round trip"""
+    keys = {theater_id: _version_key(theater_id) for theater_id in theater_ids}
+    found = cache.get_many(keys.values())
+    return {
+        theater_id: found[key] if key in found else get_seat_map_version(theater_id)
+        for theater_id, key in keys.items()
+    }
+
+
+def get_seat_map(theater_id):
+    """Seat map snapshot for the show's current version, built on a miss"""
+    key = _snapshot_key(theater_id, get_seat_map_version(theater_id))
+    seat_map = cache.get(key)
+    if seat_map is None:
+        seat_map = build_seat_map(theater_id)
+        cache.set(key, seat_map, _snapshot_timeout())
+    return seat_map
+
+
+async def aget_seat_map(theater_id):
+    """Async get_seat_map for ASGI views"""
+    key = _snapshot_key(theater_id, await aget_seat_map_version(theater_id))
+    seat_map = await cache.aget(key)
+    if seat_map is None:
+        seat_map = await abuild_seat_map(theater_id)
+        await cache.aset(key, seat_map, _snapshot_timeout())
+    return seat_map
+
+
+def seat_topic(theater_id):
+    """Pub/sub topic announcing new seat map versions of a show"""
+    return f'seats:{theater_id}'
+
+
+def bump_seat_map_version(theater_id):
+    """Move a show's seat map to a new version and tell live subscribers"""
+    cache.set(_version_key(theater_id), uuid.uuid4().hex, timeout=None)
+    get_broker().publish(seat_topic(theater_id), theater_id)
+
+
+def invalidate_seat_maps(theater_ids):
+    """Bump the seat map version of each show once the current transaction commits"""
+    theater_ids = set(theater_ids)
+
+    def bump():
+        for theater_id in theater_ids:
+            bump_seat_map_version(theater_id)
+
+    if theater_ids:
+        transaction.on_commit(bump)
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Movie, Theater, Seat
+from .catalog import invalidate_catalog
+from .seat_map import invalidate_seat_maps
+
+
+@receiver(post_save, sender=Seat)
+@receiver(post_delete, sender=Seat)
+def seat_changed(sender, instance, **kwargs):
+    """Single-row Seat writes (admin, Seat.reserve, ...) move the show's seat map version"""
+    invalidate_seat_maps([instance.theater_id])
+
+
+@receiver(post_save, sender=Theater)
+@receiver(post_delete, sender=Theater)
+def theater_changed(sender, instance, **kwargs):
+    """Show time or name edits change the listings that carry the show's seat map version"""
+    invalidate_seat_maps([instance.id])
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def movie_changed(sender, instance, **kwargs):
+    """Admin edits to the catalog move the catalog version"""
+    invalidate_catalog()
@@ -0,0 +1,119 @@
+"""
+In-process prefix trie for search-box autocomplete.
+
+Every movie title and cast member is inserted under its full text and under
+each later word, so "khan" suggests "Shah Rukh Khan" as well as titles that
+start with "Khan". Each trie node keeps its own top-k suggestions, computed
+once at build time, so a lookup walks len(prefix) nodes and copies at most k
+entries, with no sorting and no database access.
+
+The index hangs off the catalog snapshot (Catalog.suggestions), so it is
+rebuilt whenever a Movie save/delete moves the catalog version.
+"""
+
+import re
+from collections import namedtuple
+
+
+SUGGEST_LIMIT = 8
+
+# Longest prefix that gets its own trie node; longer queries are filtered from there
+MAX_PREFIX = 24
+
+Suggestion = namedtuple('Suggestion', ['kind', 'label', 'movie_id', 'score'])
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Casefolded text with runs of whitespace collapsed"""
+    return _SPACE_RE.sub(' ', (text or '').casefold()).strip()
+
+
+def _word_starts(text):
+    """The text itself plus every suffix starting at a later word"""
+    starts = [text]
+    for match in re.finditer(r' (?=\S)', text):
+        starts.append(text[match.end():])
+    return starts
+
+
+def _cast_members(cast):
+    return [name.strip() for name in re.split(r'[,/;|]', cast or '') if name.strip()]
+
+
+class SuggestIndex:
+    """Trie of movie titles and cast names with precomputed top-k per node"""
+    def __init__(self, limit=SUGGEST_LIMIT):
+        self.limit = limit
+        self.root = {}
+        self.size = 0
+
+    def _insert(self, key, suggestion):
+        node = self.root
+        for char in key[:MAX_PREFIX]:
+            node = node.setdefault(char, {})
+            node.setdefault(None, []).append(suggestion)
+
+    def _finish(self, node):
+        """Sort and trim every node's candidate list, dropping duplicates"""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            candidates = node.get(None)
+            if candidates:
+                candidates.sort(key=lambda s: (s.kind != 'movie', -s.score, s.label))
+                seen = set()
+                top = []
+                for suggestion in candidates:
+                    key = (suggestion.kind, suggestion.label, suggestion.movie_id)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    top.append(suggestion)
+                    if len(top) == self.limit:
+                        break
+                node[None] = top
+            stack.extend(child for char, child in node.items() if char is not None)
+
+    @classmethod
+    def build(cls, movies, limit=SUGGEST_LIMIT):
+        """Index an iterable of movie-like objects (name, cast, rating, id)"""
+        index = cls(limit)
+        people = {}
+        for movie in movies:
+            score = float(getattr(movie, 'rating', 0) or 0)
+            title = Suggestion('movie', movie.name, movie.id, score)
+            for key in _word_starts(normalize(movie.name)):
+                index._insert(key, title)
+            index.size += 1
+            for name in _cast_members(getattr(movie, 'cast', '')):
+                # A person links to their best rated movie
+                best = people.get(name)
+                if best is None or score > best.score:
+                    people[name] = Suggestion('cast', name, movie.id, score)
+        for person in people.values():
+            for key in _word_starts(normalize(person.label)):
+                index._insert(key, person)
+            index.size += 1
+        index._finish(index.root)
+        return index
+
+    def suggest(self, query, limit=None):
+        """Top suggestions whose title or name has a word starting with query"""
+        limit = min(limit or self.limit, self.limit)
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        node = self.root
+        for char in prefix[:MAX_PREFIX]:
+            node = node.get(char)
+            if node is None:
+                return []
+        candidates = node.get(None, [])
+        if len(prefix) > MAX_PREFIX:
+            candidates = [
+                s for s in candidates
+                if any(key.startswith(prefix) for key in _word_starts(normalize(s.label)))
+            ]
+        return candidates[:limit]
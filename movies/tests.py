@@ -1,3 +1,514 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .booking_utils import booking_history, confirm_bookings, hold_seats, reserve_best_available, reserve_seats
+from .email_utils import claim_email_jobs, process_email_jobs, queue_booking_confirmation, retry_delay
+from .idempotency import IdempotencyConflict, begin_idempotent_request, request_fingerprint
+from .management.commands.cleanup_reservations import Command as CleanupCommand
+from .models import Movie, Theater, Seat, Booking, DailySalesRollup, EmailJob, SeatLayout
+from .sales_rollup import rebuild_daily_sales
+from .search import search_movie_ids, search_vocabulary
+from .seat_map import bump_seat_map_version, get_seat_map, get_seat_map_version
+
+
+class AdminDashboardQueryTests(TestCase):
+    """The dashboard must cost a fixed number of queries however much data there is"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='pw', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def add_show(self, index, paid_seats):
+        movie = Movie.objects.create(
+            name=f'Movie {index}', image='movies/test.jpg', rating=7, cast='Cast',
+            genre=['action', 'drama', 'comedy'][index % 3],
+        )
+        theater = Theater.objects.create(name=f'Hall {index}', movie=movie, time=timezone.now())
+        customer = User.objects.create_user(username=f'customer{index}')
+        for number in range(paid_seats):
+            seat = Seat.objects.create(theater=theater, seat_number=f'A{number}', is_booked=True)
+            Booking.objects.create(
+                user=customer, seat=seat, movie=movie, theater=theater,
+                payment_status='paid', payment_method='razorpay',
+                payment_date=timezone.now() - timedelta(days=number),
+            )
+        rebuild_daily_sales()
+
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    def test_query_count_does_not_grow_with_data(self):
+        self.add_show(0, paid_seats=2)
+        baseline = self.dashboard_queries()
+
+        for index in range(1, 8):
+            self.add_show(index, paid_seats=8)
+        self.assertEqual(self.dashboard_queries(), baseline)
+        self.assertLessEqual(baseline, 15)
+
+    def test_revenue_trend_covers_seven_days(self):
+        self.add_show(0, paid_seats=3)
+        response = self.client.get(reverse('admin_dashboard'))
+        trend = json.loads(response.context['revenue_trend'])
+        self.assertEqual(len(trend), 7)
+        self.assertEqual(sum(day['bookings'] for day in trend), 3)
+        self.assertEqual(response.context['total_bookings'], 3)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CatalogTests(TestCase):
+    """The movie listing served from the catalog snapshot"""
+
+    def setUp(self):
+        cache.clear()
+
+    def add_movie(self, name, genre, language='english', **fields):
+        return Movie.objects.create(
+            name=name, image='movies/test.jpg', rating=7, cast='Cast', genre=genre, language=language, **fields
+        )
+
+    def test_filter_options_show_facet_counts(self):
+        self.add_movie('First', 'action')
+        self.add_movie('Second', 'action', 'hindi')
+        self.add_movie('Third', 'drama')
+
+        response = self.client.get(reverse('movie_list'))
+
+        self.assertContains(response, 'Action (2)')
+        self.assertContains(response, 'Drama (1)')
+        self.assertContains(response, 'Horror (0)')
+        self.assertContains(response, 'English (2)')
+        self.assertContains(response, 'Hindi (1)')
+
+    def test_show_listing_etag_has_a_fixed_length(self):
+        movie = self.add_movie('Busy', 'action')
+        start = timezone.now() + timedelta(days=1)
+        # A week of four daily showings in ten halls
+        shows = Theater.objects.bulk_create([
+            Theater(name=f'Hall {index % 10}', movie=movie, time=start + timedelta(hours=index))
+            for index in range(280)
+        ])
+        url = reverse('movie_detail', args=[movie.id])
+
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertLess(len(etag), 64)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        bump_seat_map_version(shows[-1].id)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertEqual(len(changed['ETag']), len(etag))
+
+
+class MovieSearchTests(TestCase):
+    """The full-text index follows every Movie write through the migration's triggers"""
+
+    def add_movie(self, name, cast, description=''):
+        return Movie.objects.create(
+            name=name, image='movies/test.jpg', rating=7, cast=cast, description=description
+        )
+
+    def test_index_follows_save_rename_and_delete(self):
+        movie = self.add_movie('Interstellar', 'Matthew McConaughey')
+        self.assertEqual(search_movie_ids('inter'), [movie.id])
+        self.assertEqual(search_movie_ids('mcconaughey'), [movie.id])
+
+        movie.name = 'Tenet'
+        movie.save()
+        self.assertEqual(search_movie_ids('interstellar'), [])
+        self.assertEqual(search_movie_ids('tenet'), [movie.id])
+
+        # Bulk updates bypass save() but not the triggers
+        Movie.objects.filter(id=movie.id).update(cast='John David Washington')
+        self.assertEqual(search_movie_ids('mcconaughey'), [])
+        self.assertEqual(search_movie_ids('washington'), [movie.id])
+
+        movie.delete()
+        self.assertEqual(search_movie_ids('tenet'), [])
+
+    def test_name_matches_rank_above_cast_and_description(self):
+        in_description = self.add_movie('Quiet Place', 'Emily Blunt', description='A story about dunes')
+        in_cast = self.add_movie('Sicario', 'Dune Actor')
+        in_name = self.add_movie('Dune', 'Timothee Chalamet')
+
+        self.assertEqual(search_movie_ids('dune'), [in_name.id, in_cast.id, in_description.id])
+
+    def test_typo_is_corrected_once_against_the_vocabulary(self):
+        movie = self.add_movie('Interstellar', 'Matthew McConaughey')
+        vocabulary = search_vocabulary(Movie.objects.all())
+
+        self.assertEqual(search_movie_ids('intrestellar'), [])
+        self.assertEqual(search_movie_ids('intrestellar', vocabulary=vocabulary), [movie.id])
+        self.assertEqual(search_movie_ids('zzzz', vocabulary=vocabulary), [])
+
+
+class BookingHistoryTests(TestCase):
+    """Profile history pages are keyset-paginated and never split an order across pages"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer')
+        movie = Movie.objects.create(name='Movie', image='movies/test.jpg', rating=7, cast='Cast')
+        self.theater = Theater.objects.create(name='Hall', movie=movie, time=timezone.now())
+        self.seat_count = 0
+        self.booked_at = timezone.now()
+
+    def add_order(self, size):
+        """An order of size seats, booked a minute before the previous order"""
+        self.booked_at -= timedelta(minutes=1)
+        order = f'pay_{self.seat_count}'
+        for _ in range(size):
+            self.seat_count += 1
+            seat = Seat.objects.create(theater=self.theater, seat_number=f'A{self.seat_count}')
+            booking = Booking.objects.create(
+                user=self.user, seat=seat, movie=self.theater.movie, theater=self.theater,
+                payment_status='paid', payment_id=order,
+            )
+            Booking.objects.filter(id=booking.id).update(booked_at=self.booked_at)
+
+    def pages(self, page_size):
+        pages, cursor = [], (None, None)
+        while True:
+            groups, cursor = booking_history(self.user, *cursor, page_size=page_size)
+            pages.append([len(group.seats) for group in groups])
+            if cursor is None:
+                return pages
+
+    def test_a_cut_order_moves_to_the_next_page_whole(self):
+        for size in (3, 3, 2):
+            self.add_order(size)
+
+        self.assertEqual(self.pages(page_size=4), [[3], [3], [2]])
+
+    def test_an_order_larger_than_a_page_stays_on_one_page(self):
+        for size in (6, 1):
+            self.add_order(size)
+
+        self.assertEqual(self.pages(page_size=4), [[6], [1]])
+
+    def test_an_oversized_last_order_ends_the_history(self):
+        self.add_order(9)
+
+        self.assertEqual(self.pages(page_size=4), [[9]])
+
+    def test_a_page_is_one_query(self):
+        for size in (2, 2, 2):
+            self.add_order(size)
+
+        with self.assertNumQueries(1):
+            groups, cursor = booking_history(self.user, page_size=10)
+            [(group.movie.name, group.theater.name, group.seats) for group in groups]
+        self.assertEqual(len(groups), 3)
+        self.assertIsNone(cursor)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Mail backend whose server rejects every message"""
+
+    def send_messages(self, email_messages):
+        raise SMTPException('451 try again later')
+
+
+class EmailOutboxTests(TestCase):
+    """Claiming, leasing and retrying queued confirmation emails"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com')
+        movie = Movie.objects.create(name='Movie', image='movies/test.jpg', rating=7, cast='Cast')
+        self.theater = Theater.objects.create(name='Hall', movie=movie, time=timezone.now())
+        seat = Seat.objects.create(theater=self.theater, seat_number='A1', is_booked=True)
+        booking = Booking.objects.create(
+            user=self.user, seat=seat, movie=movie, theater=self.theater,
+            payment_status='paid', payment_id='pay_1',
+        )
+        self.job = queue_booking_confirmation(self.user, [booking], self.theater)
+
+    def make_due(self):
+        EmailJob.objects.filter(id=self.job.id).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_claimed_jobs_are_leased(self):
+        first = claim_email_jobs(10)
+
+        self.assertEqual([job.id for job in first], [self.job.id])
+        self.assertEqual(claim_email_jobs(10), [])
+        self.assertGreater(
+            EmailJob.objects.get(id=self.job.id).next_attempt_at, timezone.now() + timedelta(minutes=59)
+        )
+
+        # A worker that died mid-send loses the job once its lease runs out
+        self.make_due()
+        second = claim_email_jobs(10)
+        self.assertEqual([job.id for job in second], [self.job.id])
+        self.assertNotEqual(second[0].claim_token, first[0].claim_token)
+
+    def test_sent_job_is_done(self):
+        self.assertEqual(process_email_jobs(), (1, 0, 0))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['alice@example.com'])
+        job = EmailJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.attempts), ('sent', 1))
+        self.assertIsNotNone(job.sent_at)
+        self.assertEqual(process_email_jobs(), (0, 0, 0))
+
+    @override_settings(EMAIL_BACKEND='movies.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        self.assertEqual(retry_delay(1), timedelta(seconds=30))
+        self.assertEqual(retry_delay(2), timedelta(seconds=60))
+        self.assertEqual(retry_delay(20), timedelta(hours=1))
+
+        self.assertEqual(process_email_jobs(max_attempts=2), (0, 1, 0))
+        job = EmailJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertIn('451', job.last_error)
+        self.assertGreater(job.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        self.assertLess(job.next_attempt_at, timezone.now() + timedelta(seconds=31))
+        # Not due again until the backoff has passed
+        self.assertEqual(process_email_jobs(max_attempts=2), (0, 0, 0))
+
+        self.make_due()
+        self.assertEqual(process_email_jobs(max_attempts=2), (0, 0, 1))
+        job = EmailJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.make_due()
+        self.assertEqual(process_email_jobs(max_attempts=2), (0, 0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BookingPathTests(TransactionTestCase):
+    """Holds, confirmation and payment replay with real commits (on_commit hooks run)"""
+
+    def setUp(self):
+        self.movie = Movie.objects.create(name='Movie', image='movies/test.jpg', rating=7, cast='Cast')
+        self.theater = Theater.objects.create(
+            name='Hall', movie=self.movie, time=timezone.now() + timedelta(days=1)
+        )
+        self.seats = Seat.objects.bulk_create([
+            Seat(theater=self.theater, seat_number=f'A{number}') for number in range(1, 7)
+        ])
+        self.alice = User.objects.create_user(username='alice', password='pw', email='alice@example.com')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+
+    def seat_ids(self, *indexes):
+        return [self.seats[index].id for index in indexes]
+
+    def test_partial_hold_reports_every_lost_seat_and_claims_none(self):
+        Seat.objects.filter(id=self.seats[0].id).update(is_booked=True)
+        self.assertTrue(hold_seats(self.theater, self.seat_ids(1), self.bob).ok)
+
+        hold = hold_seats(self.theater, self.seat_ids(0, 1, 2), self.alice)
+
+        self.assertFalse(hold.ok)
+        self.assertEqual(sorted(hold.lost), [('A1', 'booked'), ('A2', 'reserved')])
+        self.assertEqual(hold.lost_labels(), ['A1 (booked)', 'A2 (reserved)'])
+        # The free seat from the failed request was not left held
+        self.assertIsNone(Seat.objects.get(id=self.seats[2].id).reserved_by)
+        self.assertEqual(Seat.objects.get(id=self.seats[1].id).reserved_by, self.bob)
+
+    def test_junk_seat_ids_are_rejected(self):
+        self.client.force_login(self.alice)
+
+        response = self.client.post(reverse('book_seats', args=[self.theater.id]), {'seats': ['abc']})
+
+        self.assertEqual(response.context['error'], 'No seat selected')
+        self.assertFalse(Booking.objects.exists())
+
+    def test_double_confirm_books_once(self):
+        hold = reserve_seats(self.theater, self.seat_ids(0, 1), self.alice, amount=100)
+        self.assertTrue(hold.ok)
+
+        self.assertTrue(confirm_bookings(hold.bookings, 'pay_1', 'test'))
+        self.assertFalse(confirm_bookings(hold.bookings, 'pay_1', 'test'))
+
+        self.assertEqual(Booking.objects.filter(payment_status='paid').count(), 2)
+        self.assertEqual(Seat.objects.filter(is_booked=True).count(), 2)
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual((rollup.bookings, rollup.seats), (1, 2))
+
+    def test_expired_hold_can_be_taken_by_another_user(self):
+        stale = reserve_seats(self.theater, self.seat_ids(0), self.alice, amount=100)
+        Seat.objects.filter(id=self.seats[0].id).update(reserved_until=timezone.now() - timedelta(seconds=1))
+
+        fresh = reserve_seats(self.theater, self.seat_ids(0), self.bob, amount=100)
+
+        self.assertTrue(fresh.ok)
+        self.assertEqual(Seat.objects.get(id=self.seats[0].id).reserved_by, self.bob)
+        # Alice's lapsed pending booking made way for Bob's and can no longer be paid
+        self.assertFalse(Booking.objects.filter(id=stale.bookings[0].id).exists())
+        self.assertFalse(confirm_bookings(stale.bookings, 'pay_late', 'test'))
+        self.assertTrue(confirm_bookings(fresh.bookings, 'pay_bob', 'test'))
+
+    def test_reaper_releases_the_oldest_batch_first(self):
+        now = timezone.now()
+        expired = []
+        for index in range(5):
+            hold = reserve_seats(self.theater, self.seat_ids(index), self.alice, amount=100)
+            Seat.objects.filter(id=self.seats[index].id).update(reserved_until=now - timedelta(minutes=1))
+            Booking.objects.filter(id=hold.bookings[0].id).update(booked_at=now - timedelta(minutes=10 + index))
+            expired.append(hold.bookings[0].id)
+        fresh = reserve_seats(self.theater, self.seat_ids(5), self.alice, amount=100)
+
+        self.assertEqual(Booking.release_expired_bookings(limit=3), 3)
+
+        # The three oldest went first and their seats are free again
+        remaining = set(Booking.objects.values_list('id', flat=True))
+        self.assertEqual(remaining, {expired[0], expired[1], fresh.bookings[0].id})
+        self.assertFalse(Seat.objects.filter(id__in=self.seat_ids(2, 3, 4), reserved_by__isnull=False).exists())
+        self.assertEqual(Seat.objects.filter(id__in=self.seat_ids(0, 1, 5), reserved_by=self.alice).count(), 3)
+
+        out = StringIO()
+        command = CleanupCommand(stdout=out)
+        command.clear_sessions = False
+        self.assertEqual(command.run_cycle(batch_size=1, max_batches=1, stop=threading.Event()), 1)
+        self.assertIn('reaped=1 batches=1', out.getvalue())
+        self.assertIn('backlog=1', out.getvalue())
+
+    def test_reaper_keeps_a_booking_confirmed_during_its_batch(self):
+        hold = reserve_seats(self.theater, self.seat_ids(0), self.alice, amount=100)
+        Booking.objects.filter(id=hold.bookings[0].id).update(booked_at=timezone.now() - timedelta(minutes=10))
+
+        def pay_mid_batch(theater_ids):
+            # The payment lands after the batch SELECT, before its DELETE
+            Booking.objects.filter(id=hold.bookings[0].id).update(payment_status='paid')
+
+        with mock.patch('movies.seat_map.invalidate_seat_maps', side_effect=pay_mid_batch):
+            self.assertEqual(Booking.release_expired_bookings(limit=10), 0)
+        self.assertTrue(Booking.objects.filter(id=hold.bookings[0].id, payment_status='paid').exists())
+
+    def test_committed_writes_move_the_seat_map_version(self):
+        versions = [get_seat_map_version(self.theater.id)]
+        self.assertEqual(get_seat_map(self.theater.id).state()[:2], '00')
+
+        hold = reserve_seats(self.theater, self.seat_ids(0), self.alice, amount=100)
+        versions.append(get_seat_map_version(self.theater.id))
+        self.assertEqual(get_seat_map(self.theater.id).state()[0], '1')
+
+        confirm_bookings(hold.bookings, 'pay_1', 'test')
+        versions.append(get_seat_map_version(self.theater.id))
+        self.assertEqual(get_seat_map(self.theater.id).state()[0], '2')
+
+        stale = reserve_seats(self.theater, self.seat_ids(1), self.alice, amount=100)
+        Seat.objects.filter(id=self.seats[1].id).update(reserved_until=timezone.now() - timedelta(seconds=1))
+        Booking.objects.filter(id=stale.bookings[0].id).update(booked_at=timezone.now() - timedelta(minutes=10))
+        versions.append(get_seat_map_version(self.theater.id))
+        Booking.release_expired_bookings()
+        versions.append(get_seat_map_version(self.theater.id))
+
+        self.assertEqual(len(set(versions)), len(versions))
+
+    def test_rolled_back_hold_keeps_the_seat_map_version(self):
+        version = get_seat_map_version(self.theater.id)
+
+        Seat.objects.filter(id=self.seats[0].id).update(is_booked=True)
+        self.assertFalse(hold_seats(self.theater, self.seat_ids(0, 1), self.alice).ok)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.assertTrue(hold_seats(self.theater, self.seat_ids(2), self.alice).ok)
+                raise RuntimeError('payment gateway down')
+
+        self.assertEqual(get_seat_map_version(self.theater.id), version)
+        self.assertIsNone(Seat.objects.get(id=self.seats[2].id).reserved_by)
+
+    def test_layout_rejects_bad_tier_prices(self):
+        for price in ('abc', '-5', 'NaN', [100]):
+            layout = SeatLayout(name='Audi', grid='4s', tiers={'s': {'name': 'Standard', 'price': price}})
+            with self.assertRaises(ValidationError) as rejected:
+                layout.full_clean()
+            self.assertIn('tiers', rejected.exception.message_dict)
+
+        layout = SeatLayout(name='Audi', grid='4s', tiers={'s': {'name': 'Standard', 'price': '180.50'}})
+        layout.full_clean()
+        self.assertEqual(layout.tier_prices(), {'s': Decimal('180.50')})
+
+    def test_stale_seat_copy_loses_the_compare_and_swap(self):
+        first = Seat.objects.get(id=self.seats[0].id)
+        second = Seat.objects.get(id=self.seats[0].id)
+
+        self.assertTrue(first.reserve(self.alice))
+        self.assertFalse(second.reserve(self.bob))
+        self.assertFalse(second.release_reservation())
+
+        seat = Seat.objects.get(id=self.seats[0].id)
+        self.assertEqual(seat.reserved_by, self.alice)
+        self.assertEqual(seat.version, first.version)
+        self.assertEqual(second.version, 0)
+
+    def test_payment_retry_is_replayed(self):
+        self.client.force_login(self.alice)
+        self.client.post(
+            reverse('book_seats', args=[self.theater.id]), {'seats': self.seat_ids(0, 1)}
+        )
+        url = reverse('process_payment')
+        body = json.dumps({'payment_id': 'pay_1', 'payment_method': 'test'})
+
+        first = self.client.post(url, body, content_type='application/json')
+        second = self.client.post(url, body, content_type='application/json')
+
+        self.assertTrue(first.json()['success'])
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.filter(payment_status='paid').count(), 2)
+        self.assertEqual(EmailJob.objects.count(), 1)
+
+    def test_idempotency_key_conflicts(self):
+        fingerprint = request_fingerprint(payment_id='pay_1', payment_method='test')
+        begin_idempotent_request(self.alice, 'key', fingerprint)
+
+        with self.assertRaises(IdempotencyConflict) as in_progress:
+            begin_idempotent_request(self.alice, 'key', fingerprint)
+        self.assertEqual(in_progress.exception.status, 409)
+
+        other = request_fingerprint(payment_id='pay_2', payment_method='test')
+        with self.assertRaises(IdempotencyConflict) as mismatch:
+            begin_idempotent_request(self.alice, 'key', other)
+        self.assertEqual(mismatch.exception.status, 422)
+
+    def add_layout_show(self, grid):
+        layout = SeatLayout.objects.create(name=grid, grid=grid)
+        theater = Theater.objects.create(
+            name='Audi', movie=self.movie, time=timezone.now() + timedelta(days=1), layout=layout
+        )
+        layout.generate_seats(theater)
+        return theater
+
+    def test_best_available_holds_adjacent_seats_in_one_row(self):
+        theater = self.add_layout_show('8s/8s/8s/8s/8s')
+        Seat.objects.filter(theater=theater, seat_number__in=['C4', 'C5', 'D4', 'D5']).update(is_booked=True)
+
+        hold = reserve_best_available(theater, 3, self.alice)
+
+        self.assertTrue(hold.ok)
+        labels = sorted(Seat.objects.filter(id__in=hold.held).values_list('seat_number', flat=True))
+        rows = {label[0] for label in labels}
+        numbers = sorted(int(label[1:]) for label in labels)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + 3)))
+        self.assertFalse(Seat.objects.filter(id__in=hold.held, is_booked=True).exists())
+        self.assertEqual(Seat.objects.filter(reserved_by=self.alice).count(), 3)
+
+    def test_best_available_never_spans_an_aisle(self):
+        theater = self.add_layout_show('3s.3s/3s.3s')
+
+        self.assertIsNone(reserve_best_available(theater, 4, self.alice))
+        self.assertFalse(Seat.objects.filter(theater=theater, reserved_by__isnull=False).exists())
@@ -7,6 +7,9 @@ urlpatterns=[
     path('<int:movie_id>/',views.movie_detail,name='movie_detail'),
     path('<int:movie_id>/theaters',views.theater_list,name='theater_list'),
     path('theater/<int:theater_id>/seats/book/',views.book_seats,name='book_seats'),
+    path('theater/<int:theater_id>/seats/map/',views.seat_map,name='seat_map'),
+    path('theater/<int:theater_id>/seats/events/',views.seat_events,name='seat_events'),
+    path('api/suggest',views.suggest,name='suggest'),
     path('payment/',views.payment_page,name='payment_page'),
     path('payment/process/',views.process_payment,name='process_payment'),
     path('payment/success/',views.payment_success,name='payment_success'),
@@ -14,4 +17,5 @@ urlpatterns=[
     
     # Admin dashboard
     path('admin-dashboard/',admin_views.admin_dashboard,name='admin_dashboard'),
+    path('admin-dashboard/catalog-stats/',admin_views.catalog_cache_stats,name='catalog_cache_stats'),
 ]
\ No newline at end of file
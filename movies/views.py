@@ -1,11 +1,26 @@
-from django.shortcuts import render, redirect ,get_object_or_404
-from .models import Movie,Theater,Seat,Booking
+from django.shortcuts import render, redirect ,get_object_or_404, aget_object_or_404
+from .models import Movie,Theater,Booking
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.contrib import messages
-from .email_utils import send_booking_confirmation_email
+from .email_utils import queue_booking_confirmation
+from .booking_utils import (
+    reserve_seats, parse_seat_ids, confirm_bookings, cancel_pending_bookings, upcoming_shows,
+    remember_pending_booking, forget_pending_booking, reserve_best_available, MAX_PARTY_SIZE,
+)
+from .seat_map import SeatMap, aget_seat_map, get_seat_map, seat_topic
+from .pubsub import get_broker
+from .catalog import aget_catalog, get_catalog
+from .idempotency import (
+    IdempotencyConflict, request_fingerprint, begin_idempotent_request,
+    complete_idempotent_request, abandon_idempotent_request,
+)
+from .http_cache import cached_page, catalog_etag, show_listing_etag
+from .suggest import SUGGEST_LIMIT, SuggestIndex
 from django.conf import settings
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_exempt
 import json
 from datetime import datetime
@@ -18,7 +33,12 @@ from . import demo_data
 # Check if running on Vercel (read-only filesystem)
 IS_DEMO_MODE = os.environ.get('VERCEL', False) or not os.access(settings.BASE_DIR, os.W_OK)
 
-def movie_list(request):
+# Templates read request.user, messages and the session lazily, which may
+# query the database, so async views render in a worker thread
+_render = sync_to_async(render)
+
+@cached_page(catalog_etag)
+async def movie_list(request):
     # Get filter parameters
     search_query = request.GET.get('search')
     genre_filter = request.GET.get('genre')
@@ -30,24 +50,21 @@ def movie_list(request):
         genres = demo_data.GENRE_CHOICES
         languages = demo_data.LANGUAGE_CHOICES
     else:
-        # Use database locally
-        movies = Movie.objects.all()
-        
-        # Apply search filter
+        # Filter the cached catalog snapshot in memory; text search queries
+        # the full-text index, so it runs in a worker thread
+        catalog = await aget_catalog()
         if search_query:
-            movies = movies.filter(name__icontains=search_query)
-        
-        # Apply genre filter
-        if genre_filter:
-            movies = movies.filter(genre=genre_filter)
-        
-        # Apply language filter
-        if language_filter:
-            movies = movies.filter(language=language_filter)
+            movies = await sync_to_async(catalog.filter)(search_query, genre_filter, language_filter)
+        else:
+            movies = catalog.filter(search_query, genre_filter, language_filter)
         
-        # Get all unique genres and languages for filter dropdowns
-        genres = Movie.GENRE_CHOICES
-        languages = Movie.LANGUAGE_CHOICES
+        # Filter dropdowns, each option labelled with its facet count
+        genres = [
+            (code, f'{name} ({catalog.genre_counts[code]})') for code, name in Movie.GENRE_CHOICES
+        ]
+        languages = [
+            (code, f'{name} ({catalog.language_counts[code]})') for code, name in Movie.LANGUAGE_CHOICES
+        ]
     
     context = {
         'movies': movies,
@@ -58,20 +75,22 @@ def movie_list(request):
         'is_demo': IS_DEMO_MODE,
     }
     
-    return render(request, 'movies/movie_list.html', context)
+    return await _render(request, 'movies/movie_list.html', context)
 
-def movie_detail(request, movie_id):
-    movie = get_object_or_404(Movie, id=movie_id)
-    theaters = Theater.objects.filter(movie=movie)
+@cached_page(show_listing_etag)
+async def movie_detail(request, movie_id):
+    movie = await aget_object_or_404(Movie, id=movie_id)
+    theaters = [theater async for theater in upcoming_shows(movie.id)]
     
     context = {
         'movie': movie,
         'theaters': theaters,
     }
     
-    return render(request, 'movies/movie_detail.html', context)
+    return await _render(request, 'movies/movie_detail.html', context)
 
-def theater_list(request,movie_id):
+@cached_page(show_listing_etag)
+async def theater_list(request,movie_id):
     if IS_DEMO_MODE:
         # Use demo data
         movie = demo_data.get_demo_movie(movie_id)
@@ -81,10 +100,10 @@ def theater_list(request,movie_id):
         theater = demo_data.get_demo_theaters(movie_id)
     else:
         # Use database
-        movie = get_object_or_404(Movie,id=movie_id)
-        theater=Theater.objects.filter(movie=movie)
+        movie = await aget_object_or_404(Movie,id=movie_id)
+        theater=[show async for show in upcoming_shows(movie.id)]
     
-    return render(request,'movies/theater_list.html',{
+    return await _render(request,'movies/theater_list.html',{
         'movie':movie,
         'theaters':theater,
         'is_demo': IS_DEMO_MODE
@@ -92,6 +111,26 @@ def theater_list(request,movie_id):
 
 
 
+def live_seat_updates(request):
+    """Live seat events are only offered when enabled and served over ASGI"""
+    return (
+        getattr(settings, 'SEAT_EVENTS_ENABLED', False)
+        and isinstance(request, ASGIRequest)
+        and not IS_DEMO_MODE
+    )
+
+
+def _seat_selection(request, theaters, error=None):
+    context = {
+        'theaters': theaters,
+        'seats': get_seat_map(theaters.id).cells(),
+        'live_updates': live_seat_updates(request),
+    }
+    if error:
+        context['error'] = error
+    return render(request, 'movies/seat_selection.html', context)
+
+
 @login_required(login_url='/login/')
 def book_seats(request, theater_id):
     if IS_DEMO_MODE:
@@ -101,89 +140,140 @@ def book_seats(request, theater_id):
     
     # Normal database mode
     theaters = get_object_or_404(Theater, id=theater_id)
-    seats = Seat.objects.filter(theater=theaters)
-    
-    # Clean up expired reservations and bookings before showing seats
-    Booking.release_expired_bookings()
     
     if request.method == 'POST':
-        selected_Seats = request.POST.getlist('seats')
-        error_seats = []
-        pending_bookings = []
-        reserved_seats = []
+        selected_Seats = parse_seat_ids(request.POST.getlist('seats'))
+        party_size = request.POST.get('party_size', '')
         
-        if not selected_Seats:
-            return render(request, "movies/seat_selection.html", {'theater': theaters, "seats": seats, 'error': "No seat selected"})
+        if not selected_Seats and not party_size.isdigit():
+            return _seat_selection(request, theaters, "No seat selected")
         
-        # First, check availability and reserve seats
-        for seat_id in selected_Seats:
-            seat = get_object_or_404(Seat, id=seat_id, theater=theaters)
-            
-            # Check if seat is available
-            if not seat.is_available():
-                if seat.is_booked:
-                    error_seats.append(f"{seat.seat_number} (booked)")
-                else:
-                    error_seats.append(f"{seat.seat_number} (reserved)")
-                continue
-            
-            # Try to reserve the seat
-            if seat.reserve(request.user, minutes=5):
-                reserved_seats.append(seat)
+        # Claim every selected seat in one conditional UPDATE and create the
+        # pending bookings with one bulk INSERT, all-or-nothing
+        try:
+            if selected_Seats:
+                hold = reserve_seats(theaters, selected_Seats, request.user, minutes=5)
             else:
-                error_seats.append(f"{seat.seat_number} (unavailable)")
+                # Best available: adjacent seats picked for the whole party
+                hold = reserve_best_available(theaters, min(int(party_size), MAX_PARTY_SIZE), request.user, minutes=5)
+        except IntegrityError:
+            return _seat_selection(request, theaters, "Error booking seats, please try again")
         
-        if error_seats:
-            error_message = f"The following seats are not available: {', '.join(error_seats)}"
-            # Release any seats we reserved
-            for seat in reserved_seats:
-                seat.release_reservation()
-            return render(request, 'movies/seat_selection.html', {'theater': theaters, "seats": seats, 'error': error_message})
+        if hold is None:
+            return _seat_selection(request, theaters, f"Sorry, {party_size} seats together are not available for this show")
         
-        # Create pending bookings for reserved seats
-        for seat in reserved_seats:
-            try:
-                booking = Booking.objects.create(
-                    user=request.user,
-                    seat=seat,
-                    movie=theaters.movie,
-                    theater=theaters,
-                    payment_status='pending',
-                    amount=250.00  # Default ticket price
-                )
-                pending_bookings.append(booking)
-            except IntegrityError:
-                error_seats.append(seat.seat_number)
-                # Release the reservation
-                seat.release_reservation()
+        if not hold.ok:
+            error_message = f"The following seats are not available: {', '.join(hold.lost_labels())}"
+            return _seat_selection(request, theaters, error_message)
         
-        if error_seats:
-            error_message = f"Error booking seats: {', '.join(error_seats)}"
-            # Delete pending bookings and release reservations
-            for booking in pending_bookings:
-                booking.seat.release_reservation()
-                booking.delete()
-            return render(request, 'movies/seat_selection.html', {'theater': theaters, "seats": seats, 'error': error_message})
+        pending_bookings = hold.bookings
         
         if pending_bookings:
-            # Store booking IDs in session for payment processing
-            request.session['pending_booking_ids'] = [b.id for b in pending_bookings]
-            request.session['theater_id'] = theater_id
-            
-            # Calculate total amount
-            total_amount = sum([b.amount for b in pending_bookings])
-            
-            # Store reservation expiry time
+            # Store booking IDs and reservation expiry in session for payment processing
             first_booking = pending_bookings[0]
             expiry_time = first_booking.booked_at + timezone.timedelta(minutes=5)
-            request.session['reservation_expiry'] = expiry_time.isoformat()
+            remember_pending_booking(request.session, pending_bookings, theater_id, expiry_time)
             
             messages.success(request, f'Seats reserved for 5 minutes! Please complete payment.')
             
             # Redirect to payment page
             return redirect('payment_page')
         
-    return render(request, 'movies/seat_selection.html', {'theaters': theaters, "seats": seats})
+    return _seat_selection(request, theaters)
+
+
+async def seat_map(request, theater_id):
+    """Compact JSON seat map for a show: seat ids, labels and a state string"""
+    if IS_DEMO_MODE:
+        seats = demo_data.get_demo_seats(theater_id)
+        if not seats:
+            return JsonResponse({'success': False, 'message': 'Theater not found'}, status=404)
+        rows = [(seat.id, seat.seat_number, seat.is_booked, None) for seat in seats]
+        return JsonResponse(SeatMap.from_rows(theater_id, rows).as_dict())
+    
+    theater = await aget_object_or_404(Theater.objects.select_related('layout'), id=theater_id)
+    payload = (await aget_seat_map(theater_id)).as_dict()
+    if theater.layout:
+        # Labels match the layout's seat numbers, so the browser can place each seat on the grid
+        payload['layout'] = theater.layout.as_dict()
+    return JsonResponse(payload)
+
+
+
+async def seat_events(request, theater_id):
+    """
+    Server-sent events for one show: a 'snapshot' event with the full seat
+    map, then 'seats' events carrying {seat_id: state} deltas whenever a hold,
+    release or booking commits ('0' free, '1' held, '2' booked).
+    
+    Needs ASGI and SEAT_EVENTS_ENABLED: under WSGI Django would have to
+    consume the endless stream before sending anything, pinning a worker.
+    """
+    if not live_seat_updates(request):
+        # Demo seats never change and WSGI cannot stream; 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    
+    if not await Theater.objects.filter(id=theater_id).aexists():
+        return JsonResponse({'success': False, 'message': 'Theater not found'}, status=404)
+    
+    keepalive = getattr(settings, 'SEAT_EVENTS_KEEPALIVE', 15)
+    
+    def event(name, data):
+        return f'event: {name}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+    
+    async def stream():
+        async with get_broker().subscribe(seat_topic(theater_id)) as subscription:
+            current = await aget_seat_map(theater_id)
+            state = current.state()
+            yield event('snapshot', current.as_dict())
+            while True:
+                # Wake on every committed change, and at least every keepalive
+                # seconds so lapsed holds are reported too
+                message = await subscription.get(timeout=keepalive)
+                latest = await aget_seat_map(theater_id)
+                if latest.seat_ids != current.seat_ids:
+                    current = latest
+                    state = current.state()
+                    yield event('snapshot', current.as_dict())
+                    continue
+                changes = latest.changes(state)
+                current = latest
+                state = latest.state()
+                if changes:
+                    yield event('seats', {'changes': changes})
+                elif message is None:
+                    yield ': keepalive\n\n'
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+_demo_suggestions = None
+
+
+@cached_page(catalog_etag)
+def suggest(request):
+    """Autocomplete for the search box: movie titles and cast names starting with q"""
+    global _demo_suggestions
+    try:
+        limit = max(1, min(int(request.GET.get('limit', SUGGEST_LIMIT)), SUGGEST_LIMIT))
+    except ValueError:
+        limit = SUGGEST_LIMIT
+    
+    if IS_DEMO_MODE:
+        if _demo_suggestions is None:
+            _demo_suggestions = SuggestIndex.build(demo_data.get_demo_movies())
+        index = _demo_suggestions
+    else:
+        index = get_catalog().suggestions
+    
+    results = [
+        {'type': s.kind, 'label': s.label, 'movie_id': s.movie_id}
+        for s in index.suggest(request.GET.get('q', ''), limit)
+    ]
+    return JsonResponse({'query': request.GET.get('q', ''), 'results': results})
 
 
 @login_required(login_url='/login/')
@@ -195,16 +285,12 @@ def payment_page(request):
         messages.error(request, 'No pending bookings found.')
         return redirect('movie_list')
     
-    # Clean up expired bookings
-    Booking.release_expired_bookings()
-    
     bookings = Booking.objects.filter(id__in=booking_ids, user=request.user, payment_status='pending')
     
     if not bookings:
         messages.error(request, 'Booking session has expired. Please select seats again.')
         # Clear session
-        request.session.pop('pending_booking_ids', None)
-        request.session.pop('reservation_expiry', None)
+        forget_pending_booking(request.session)
         return redirect('movie_list')
     
     # Check if any booking has expired
@@ -217,12 +303,9 @@ def payment_page(request):
     if expired:
         messages.error(request, 'Your seat reservation has expired. Please select seats again.')
         # Release all reservations and delete bookings
-        for booking in bookings:
-            booking.seat.release_reservation()
-            booking.delete()
+        cancel_pending_bookings([b.id for b in bookings], request.user)
         # Clear session
-        request.session.pop('pending_booking_ids', None)
-        request.session.pop('reservation_expiry', None)
+        forget_pending_booking(request.session)
         return redirect('movie_list')
     
     total_amount = sum([b.amount for b in bookings])
@@ -252,64 +335,89 @@ def payment_page(request):
     return render(request, 'movies/payment.html', context)
 
 
+def _confirm_pending_payment(request, payment_id, payment_method):
+    """Confirm the session's pending bookings; returns the JSON result"""
+    booking_ids = request.session.get('pending_booking_ids', [])
+    
+    if not booking_ids:
+        return {'success': False, 'message': 'No pending bookings'}
+    
+    bookings = list(
+        Booking.objects.filter(id__in=booking_ids, user=request.user, payment_status='pending')
+        .select_related('seat', 'movie', 'theater')
+    )
+    
+    if not bookings:
+        return {'success': False, 'message': 'No valid bookings found'}
+    
+    # Check if bookings have expired
+    for booking in bookings:
+        if booking.is_expired():
+            return {'success': False, 'message': 'Booking has expired'}
+    
+    # Mark bookings paid and seats booked in bulk, and queue the
+    # confirmation email in the same transaction (sent by send_queued_emails)
+    if not confirm_bookings(bookings, payment_id, payment_method):
+        return {'success': False, 'message': 'Booking has expired'}
+    queue_booking_confirmation(request.user, bookings, bookings[0].theater)
+    
+    # Clear session
+    forget_pending_booking(request.session)
+    
+    return {
+        'success': True,
+        'message': 'Payment successful!',
+        'redirect_url': '/profile/'
+    }
+
+
 @csrf_exempt
 @login_required(login_url='/login/')
 def process_payment(request):
-    """Process Razorpay payment"""
+    """
+    Process Razorpay payment.
+    
+    Retries carrying the same idempotency key (Idempotency-Key header or
+    idempotency_key field, else the gateway payment_id) get the first
+    request's result back without touching bookings, seats or emails.
+    """
     if request.method == 'POST':
+        record = None
         try:
             data = json.loads(request.body)
             payment_id = data.get('payment_id')
             payment_method = data.get('payment_method', 'razorpay')
             
-            booking_ids = request.session.get('pending_booking_ids', [])
+            key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+            if not key and payment_id:
+                key = f'payment:{payment_id}'
+            if key:
+                fingerprint = request_fingerprint(payment_id=payment_id, payment_method=payment_method)
+                record, stored = begin_idempotent_request(request.user, str(key)[:255], fingerprint)
+                if stored is not None:
+                    response = JsonResponse(stored)
+                    response['Idempotent-Replayed'] = 'true'
+                    return response
             
-            if not booking_ids:
-                return JsonResponse({'success': False, 'message': 'No pending bookings'})
+            # The stored result commits together with the booking updates.
+            # Failures change nothing, so their key is freed for a retry
+            # instead of replaying e.g. a lost session forever.
+            with transaction.atomic():
+                result = _confirm_pending_payment(request, payment_id, payment_method)
+                if record is not None and result['success']:
+                    complete_idempotent_request(record, result)
+            if record is not None and not result['success']:
+                abandon_idempotent_request(record)
             
-            bookings = Booking.objects.filter(id__in=booking_ids, user=request.user, payment_status='pending')
-            
-            if not bookings:
-                return JsonResponse({'success': False, 'message': 'No valid bookings found'})
-            
-            # Check if bookings have expired
-            for booking in bookings:
-                if booking.is_expired():
-                    return JsonResponse({'success': False, 'message': 'Booking has expired'})
-            
-            # Update bookings as paid
-            for booking in bookings:
-                booking.payment_status = 'paid'
-                booking.payment_id = payment_id
-                booking.payment_method = payment_method
-                booking.payment_date = timezone.now()
-                booking.save()
-                
-                # Mark seat as permanently booked and clear reservation
-                booking.seat.is_booked = True
-                booking.seat.reserved_by = None
-                booking.seat.reserved_until = None
-                booking.seat.save()
-            
-            # Send confirmation email
-            if bookings:
-                theater = bookings[0].theater
-                send_booking_confirmation_email(request.user, list(bookings), theater)
-            
-            # Clear session
-            del request.session['pending_booking_ids']
-            if 'theater_id' in request.session:
-                del request.session['theater_id']
-            if 'reservation_expiry' in request.session:
-                del request.session['reservation_expiry']
-            
-            return JsonResponse({
-                'success': True,
-                'message': 'Payment successful!',
-                'redirect_url': '/profile/'
-            })
+            return JsonResponse(result)
             
+        except IdempotencyConflict as e:
+            # 'processing' tells the page to retry rather than give up on the bookings
+            status = 'processing' if e.status == 409 else 'conflict'
+            return JsonResponse({'success': False, 'status': status, 'message': str(e)}, status=e.status)
         except Exception as e:
+            if record is not None:
+                abandon_idempotent_request(record)
             return JsonResponse({'success': False, 'message': str(e)})
     
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
@@ -328,19 +436,11 @@ def payment_failed(request):
     booking_ids = request.session.get('pending_booking_ids', [])
     
     if booking_ids:
-        bookings = Booking.objects.filter(id__in=booking_ids, user=request.user, payment_status='pending')
-        
         # Release seat reservations and delete bookings
-        for booking in bookings:
-            booking.seat.release_reservation()
-            booking.delete()
+        cancel_pending_bookings(booking_ids, request.user)
         
         # Clear session
-        del request.session['pending_booking_ids']
-        if 'theater_id' in request.session:
-            del request.session['theater_id']
-        if 'reservation_expiry' in request.session:
-            del request.session['reservation_expiry']
+        forget_pending_booking(request.session)
     
     messages.error(request, 'Payment failed or was cancelled. Please try again.')
     return redirect('movie_list')
@@ -3,10 +3,13 @@ from .forms import UserRegisterForm, UserUpdateForm
 from django.shortcuts import render,redirect
 from django.contrib.auth import login,authenticate
 from django.contrib.auth.decorators import login_required
-from movies.models import Movie , Booking
+from movies.booking_utils import booking_history
+from movies.catalog import get_catalog
+from movies.http_cache import cached_page, catalog_etag
 from django.contrib import messages
 from django.conf import settings
 import os
+from datetime import datetime
 
 # Check if running in demo mode (Vercel)
 IS_DEMO_MODE = os.environ.get('VERCEL', False) or not os.access(settings.BASE_DIR, os.W_OK)
@@ -15,11 +18,12 @@ IS_DEMO_MODE = os.environ.get('VERCEL', False) or not os.access(settings.BASE_DI
 if IS_DEMO_MODE:
     from movies import demo_data
 
+@cached_page(catalog_etag)
 def home(request):
     if IS_DEMO_MODE:
         movies = demo_data.get_demo_movies()
     else:
-        movies = Movie.objects.all()
+        movies = get_catalog().movies
     return render(request,'home.html',{'movies':movies, 'is_demo': IS_DEMO_MODE})
 
 def register(request):
@@ -65,7 +69,16 @@ def profile(request):
         messages.info(request, '🎭 Demo Mode: Profile features are disabled.')
         return redirect('movie-list')
     
-    bookings= Booking.objects.filter(user=request.user)
+    # Keyset cursor for the next page of booking history
+    before = request.GET.get('before')
+    before_id = request.GET.get('before_id')
+    try:
+        before = datetime.fromisoformat(before) if before else None
+        before_id = int(before_id) if before_id else None
+    except ValueError:
+        before, before_id = None, None
+    
+    bookings, next_cursor = booking_history(request.user, before, before_id)
     if request.method == 'POST':
         u_form = UserUpdateForm(request.POST, instance=request.user)
         if u_form.is_valid():
@@ -74,7 +87,12 @@ def profile(request):
     else:
         u_form = UserUpdateForm(instance=request.user)
 
-    return render(request, 'users/profile.html', {'u_form': u_form,'bookings':bookings})
+    return render(request, 'users/profile.html', {
+        'u_form': u_form,
+        'bookings': bookings,
+        'next_before': next_cursor[0].isoformat() if next_cursor else None,
+        'next_before_id': next_cursor[1] if next_cursor else None,
+    })
 
 @login_required
 def reset_password(request):